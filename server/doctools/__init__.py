@@ -0,0 +1 @@
+"""Helpers shared by the ingest (server/ingest) and translate (translate/) scripts."""
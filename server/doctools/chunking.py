@@ -0,0 +1,240 @@
+"""Sentence-aware chunking of page text under a token budget.
+
+Pages are consumed lazily and split into sentence units (paragraphs are separated
+by blank lines, sentences by terminal punctuation followed by an upper-case
+letter, digit or opening quote). Units are packed greedily into chunks of at most
+`max_tokens`; when a chunk is full it is cut at the last paragraph break if that
+keeps it at least `min_fill` full, otherwise at the last sentence. Chunks may span
+pages and record the page range they cover.
+
+Each unit is tokenized once and moved at most once when a chunk is cut, so the
+whole pass is linear in the input. A sentence longer than the budget is split at
+word boundaries (or, for a single huge "word", by characters).
+
+`count_tokens` is pluggable: `approx_tokens` (no dependencies), `approx_counter()`
+for a different characters-per-token ratio, `token_counter()` for tiktoken
+encodings and `hf_token_counter()` for Hugging Face tokenizers when available, or
+`len` for character budgets.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"[.!?…]+[\"'”’»)\]]*(\s+)")
+_WORD_RE = re.compile(r"\S+")
+_OPENERS = "\"'“„«(["
+
+
+def approx_tokens(text: str) -> int:
+    """~4 characters per token, the usual rule of thumb for BPE/WordPiece models."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def approx_counter(chars_per_token: float) -> Callable[[str], int]:
+    """Estimate at `chars_per_token` characters per token (rounded up)."""
+    return lambda text: max(1, -int(-len(text) // chars_per_token))
+
+
+@lru_cache(maxsize=None)
+def hf_token_counter(model: str, local_only: bool = False) -> Optional[Callable[[str], int]]:
+    """Counter using the Hugging Face tokenizer of `model`, or None if it cannot be loaded.
+
+    Needs the `tokenizers` package; the tokenizer is downloaded from the Hub on
+    first use unless `local_only`, which only reads the local Hub cache.
+    Special tokens ([CLS]/[SEP]) are not counted.
+    """
+    try:
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        path = hf_hub_download(model, "tokenizer.json", local_files_only=local_only)
+        tokenizer = Tokenizer.from_file(path)
+    except Exception:
+        return None
+    tokenizer.no_truncation()  # otherwise counts are capped at the model's max length
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def token_counter(encoding: Optional[str] = None) -> Callable[[str], int]:
+    """tiktoken counter for `encoding` if tiktoken is installed, else `approx_tokens`."""
+    if encoding:
+        try:
+            import tiktoken
+        except Exception:
+            return approx_tokens
+        enc = tiktoken.get_encoding(encoding)
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    return approx_tokens
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    page_start: int  # 1-based, inclusive
+    page_end: int
+    tokens: int
+
+
+class _Unit(NamedTuple):
+    text: str
+    sep: str  # whitespace that preceded it in the source
+    page: int
+    tokens: int
+    paragraph_start: bool
+
+
+def split_sentences(paragraph: str) -> Iterator[Tuple[str, str]]:
+    """Yield (sentence, whitespace before it) for one paragraph."""
+    start = 0
+    sep = ""
+    for match in _SENTENCE_END_RE.finditer(paragraph):
+        end = match.start(1)
+        nxt = match.end()
+        if nxt >= len(paragraph):
+            break
+        ch = paragraph[nxt]
+        if not (ch.isupper() or ch.isdigit() or ch in _OPENERS):
+            continue
+        # "J. Smith": a lone initial before the period is not a sentence end.
+        word_start = max(paragraph.rfind(" ", start, match.start()), paragraph.rfind("\n", start, match.start())) + 1
+        if match.start() - word_start == 1 and paragraph[word_start].isalpha():
+            continue
+        yield paragraph[start:end], sep
+        sep = match.group(1)
+        start = nxt
+    yield paragraph[start:], sep
+
+
+def _split_long(text: str, count_tokens: Callable[[str], int], max_tokens: int) -> Iterator[Tuple[str, str, int]]:
+    # (piece, separator before it, tokens) for a sentence that exceeds the budget.
+    pieces: List[str] = []
+    piece_tokens = 0
+    piece_start = 0
+    prev_end = 0
+    sep = ""
+    for match in _WORD_RE.finditer(text):
+        word = match.group(0)
+        tokens = count_tokens(word)
+        if tokens > max_tokens:
+            if pieces:
+                yield text[piece_start:prev_end], sep, piece_tokens
+                pieces, piece_tokens = [], 0
+            step = max(1, len(word) * max_tokens // tokens)
+            for i in range(0, len(word), step):
+                part = word[i : i + step]
+                yield part, (text[prev_end : match.start()] if i == 0 else ""), count_tokens(part)
+            prev_end = match.end()
+            sep = ""
+            continue
+        if pieces and piece_tokens + tokens > max_tokens:
+            yield text[piece_start:prev_end], sep, piece_tokens
+            pieces, piece_tokens = [], 0
+        if not pieces:
+            if prev_end:
+                sep = text[prev_end : match.start()]
+            piece_start = match.start()
+        pieces.append(word)
+        piece_tokens += tokens
+        prev_end = match.end()
+    if pieces:
+        yield text[piece_start:prev_end], sep, piece_tokens
+
+
+def _iter_units(
+    pages: Iterable[str], count_tokens: Callable[[str], int], max_tokens: int
+) -> Iterator[_Unit]:
+    for page_num, page_text in enumerate(pages, start=1):
+        if not page_text:
+            continue
+        for paragraph in _PARAGRAPH_RE.split(page_text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            first = True
+            for sentence, sep in split_sentences(paragraph):
+                sep = "\n\n" if first else sep
+                tokens = count_tokens(sentence)
+                if tokens <= max_tokens:
+                    yield _Unit(sentence, sep, page_num, tokens, first)
+                else:
+                    for i, (piece, piece_sep, piece_tokens) in enumerate(
+                        _split_long(sentence, count_tokens, max_tokens)
+                    ):
+                        yield _Unit(piece, sep if i == 0 else piece_sep, page_num, piece_tokens, first and i == 0)
+                first = False
+
+
+def _make_chunk(units: List[_Unit]) -> Chunk:
+    text = units[0].text + "".join(u.sep + u.text for u in units[1:])
+    return Chunk(
+        text=text,
+        page_start=units[0].page,
+        page_end=units[-1].page,
+        tokens=sum(u.tokens for u in units),
+    )
+
+
+def chunk_pages(
+    pages: Iterable[str],
+    *,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    count_tokens: Callable[[str], int] = approx_tokens,
+    span_pages: bool = True,
+    min_fill: float = 0.5,
+) -> Iterator[Chunk]:
+    """Stream chunks of at most `max_tokens` over `pages` (one string per page).
+
+    `overlap_tokens` repeats up to that many tokens of whole trailing sentences at
+    the start of the next chunk. With `span_pages=False` every chunk stays on one page.
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    units: List[_Unit] = []
+    tokens = 0
+    # Index of the last unit that starts a paragraph (a preferred cut point), and
+    # the token count before it.
+    last_break = 0
+    tokens_before_break = 0
+
+    def reset(new_units: List[_Unit]) -> None:
+        nonlocal units, tokens, last_break, tokens_before_break
+        units = new_units
+        tokens = 0
+        last_break = tokens_before_break = 0
+        for i, unit in enumerate(units):
+            if i and unit.paragraph_start:
+                last_break, tokens_before_break = i, tokens
+            tokens += unit.tokens
+
+    for unit in _iter_units(pages, count_tokens, max_tokens):
+        if units and not span_pages and unit.page != units[-1].page:
+            yield _make_chunk(units)
+            reset([])
+        while units and tokens + unit.tokens > max_tokens:
+            cut = len(units)
+            if last_break and tokens_before_break >= min_fill * max_tokens:
+                cut = last_break
+            emitted, rest = units[:cut], units[cut:]
+            yield _make_chunk(emitted)
+            carry: List[_Unit] = []
+            if overlap_tokens > 0:
+                budget = min(overlap_tokens, max_tokens - unit.tokens - sum(u.tokens for u in rest))
+                for prev in reversed(emitted):
+                    if prev.tokens > budget:
+                        break
+                    if not span_pages and prev.page != unit.page:
+                        break
+                    carry.insert(0, prev)
+                    budget -= prev.tokens
+            reset(carry + rest)
+        units.append(unit)
+        if len(units) > 1 and unit.paragraph_start:
+            last_break, tokens_before_break = len(units) - 1, tokens
+        tokens += unit.tokens
+
+    if units:
+        yield _make_chunk(units)
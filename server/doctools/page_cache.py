@@ -0,0 +1,200 @@
+"""Content-addressed cache of extracted per-page PDF text.
+
+Parsing PDFs is the most CPU-heavy step of both ingest and translate, yet the
+result only depends on the file's bytes and the extractor used. Entries are
+keyed by sha256(file content) + extractor backend + backend version, so renamed
+or copied files hit the cache and upgrading the extractor invalidates it.
+
+Each entry is one file: zlib-compressed page blobs followed by an index and a
+trailer. Readers mmap the file and decompress pages on demand, so a cached
+document never has to be loaded whole. The cache is bounded by size; least
+recently used entries (by mtime, touched on every hit) are evicted first. The
+size is tracked as a running total, so the directory is only scanned when the
+total goes over the limit (and every RESCAN_EVERY commits, to account for other
+processes sharing the cache).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"PTC1"
+ENTRY_SUFFIX = ".ptc"
+_INDEX_ITEM = struct.Struct("<QI")  # blob offset, blob length
+_TRAILER = struct.Struct("<QI4s")  # index offset, page count, magic
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+RESCAN_EVERY = 256
+
+
+def default_cache_dir() -> Path:
+    env = os.getenv("PAGE_TEXT_CACHE_DIR")
+    if env:
+        return Path(env).expanduser()
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "flowchat" / "page-text"
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class CachedPages:
+    """Read-only, memory-mapped view of one cache entry."""
+
+    def __init__(self, path: Path) -> None:
+        with path.open("rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _TRAILER.size:
+            self._mm.close()
+            raise ValueError(f"Truncated page cache entry: {path}")
+        index_offset, count, magic = _TRAILER.unpack_from(self._mm, len(self._mm) - _TRAILER.size)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a page cache entry: {path}")
+        self._index_offset = index_offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def page(self, index: int) -> str:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        offset, length = _INDEX_ITEM.unpack_from(self._mm, self._index_offset + index * _INDEX_ITEM.size)
+        return zlib.decompress(self._mm[offset : offset + length]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self.page(i)
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class PageTextCache:
+    def __init__(self, root: Optional[Path] = None, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = (root or default_cache_dir()).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Bytes on disk as of the last scan plus entries committed since; None until the first scan.
+        self._total_bytes: Optional[int] = None
+        self._commits_since_scan = 0
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, digest: str, backend: str, version: str) -> Path:
+        key = hashlib.sha256(f"{digest}\0{backend}\0{version}".encode("utf-8")).hexdigest()
+        return self.root / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, digest: str, backend: str, version: str) -> Optional[CachedPages]:
+        path = self.entry_path(digest, backend, version)
+        try:
+            pages = CachedPages(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(path)  # LRU bookkeeping
+        except OSError:
+            pass
+        return pages
+
+    def iter_pages(
+        self,
+        pdf_path: Path,
+        *,
+        backend: str,
+        version: str,
+        extract: Callable[[Path], Iterable[str]],
+        digest: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Yield page texts from the cache, or from `extract` while filling the cache.
+
+        On a miss the entry is only committed if the extractor runs to completion,
+        so an interrupted or failed extraction never leaves a partial entry behind.
+        """
+        digest = digest or file_digest(pdf_path)
+        cached = self.get(digest, backend, version)
+        if cached is not None:
+            with self._stats_lock:
+                self.hits += 1
+            try:
+                yield from cached
+            finally:
+                cached.close()
+            return
+
+        with self._stats_lock:
+            self.misses += 1
+        final_path = self.entry_path(digest, backend, version)
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = final_path.with_name(f"{final_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        index: List[Tuple[int, int]] = []
+        committed = False
+        try:
+            with tmp_path.open("wb") as fh:
+                offset = 0
+                for text in extract(pdf_path):
+                    blob = zlib.compress(text.encode("utf-8"), 6)
+                    fh.write(blob)
+                    index.append((offset, len(blob)))
+                    offset += len(blob)
+                    yield text
+                for item in index:
+                    fh.write(_INDEX_ITEM.pack(*item))
+                fh.write(_TRAILER.pack(offset, len(index), MAGIC))
+                size = fh.tell()
+            try:
+                replaced = final_path.stat().st_size  # another worker committed it first
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, final_path)
+            committed = True
+        finally:
+            if not committed:
+                tmp_path.unlink(missing_ok=True)
+        self._committed(size - replaced)
+
+    def _committed(self, added: int) -> None:
+        with self._evict_lock:
+            self._commits_since_scan += 1
+            if self._total_bytes is not None:
+                self._total_bytes += added
+                if self._total_bytes <= self.max_bytes and self._commits_since_scan < RESCAN_EVERY:
+                    return
+        self.evict()
+
+    def evict(self) -> int:
+        """Scan the cache and delete least recently used entries until it fits max_bytes."""
+        with self._evict_lock:
+            self._commits_since_scan = 0
+            entries = []
+            total = 0
+            for path in self.root.glob(f"*/*{ENTRY_SUFFIX}"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            self._total_bytes = total
+            return removed
@@ -0,0 +1,62 @@
+"""Turbopuffer attribute schema for document-chunk namespaces, and query filters.
+
+Turbopuffer indexes every attribute for filtering unless told otherwise, which
+costs write time and index space for attributes nobody filters on (chunk text,
+hashes, timestamps). The ingest tools send `chunk_schema()` with each write so
+only the attributes queries actually scope by are indexed; `build_filters()`
+turns simple {attribute: value(s)} filters into Turbopuffer filter expressions
+and rejects attributes that are not indexed.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional
+
+FILTERABLE_ATTRIBUTES = ("projectName", "source_pdf")
+
+# Types match what Turbopuffer infers from existing rows; changing a type is rejected.
+_ATTRIBUTE_TYPES = {
+    "projectName": "string",
+    "link": "string",
+    "source_pdf": "string",
+    "page_num": "int",
+    "page_end": "int",
+    "section": "string",
+    "chunk_index": "int",
+    "content": "string",
+    "content_hash": "string",
+    "timestamp": "string",
+}
+
+
+def chunk_schema(full_text_search: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Schema for chunk rows; `full_text_search` adds a BM25 index on `content`."""
+    schema: Dict[str, Dict[str, Any]] = {}
+    for name, type_name in _ATTRIBUTE_TYPES.items():
+        schema[name] = {"type": type_name, "filterable": name in FILTERABLE_ATTRIBUTES}
+    if full_text_search:
+        schema["content"]["full_text_search"] = True
+    return schema
+
+
+def build_filters(filters: Optional[Mapping[str, Any]]) -> Optional[List]:
+    """{"projectName": "X", "source_pdf": ["a.pdf", "b.pdf"]} -> Turbopuffer filter expression.
+
+    A scalar value becomes Eq, a list becomes In; several attributes are ANDed.
+    Returns None when there is nothing to filter on.
+    """
+    clauses: List[List] = []
+    for name, value in (filters or {}).items():
+        if value is None or value == []:
+            continue
+        if name not in FILTERABLE_ATTRIBUTES:
+            raise ValueError(
+                f"Cannot filter on '{name}' (filterable: {', '.join(FILTERABLE_ATTRIBUTES)})"
+            )
+        if isinstance(value, (list, tuple)):
+            clauses.append([name, "In", list(value)])
+        else:
+            clauses.append([name, "Eq", value])
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return ["And", clauses]
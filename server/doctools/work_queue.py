@@ -0,0 +1,287 @@
+"""Durable work queue on SQLite with leases, for several workers sharing one file.
+
+Workers may run on one machine or on several hosts that mount the same
+filesystem. Each task is claimed under a lease that the owner renews with
+heartbeats; if a worker dies its lease expires and another worker picks the
+task up again (up to `max_attempts`). Completing or failing a task checks the
+owner, so a worker that lost its lease cannot overwrite someone else's result.
+
+Every call opens its own short-lived connection, so a queue object can be used
+from several threads (e.g. the heartbeat thread) without extra locking.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL,
+    heartbeat_at REAL,
+    summary TEXT
+);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclass(frozen=True)
+class Task:
+    key: str
+    payload: Dict
+    attempts: int
+
+
+class WorkQueue:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        lease_seconds: float = 600.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        # Rollback-journal mode (the default) rather than WAL: WAL needs shared memory
+        # and does not work across hosts on network filesystems.
+        conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout = 60000")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # Tasks --------------------------------------------------------------------
+
+    def enqueue(self, items: Iterable[Tuple[str, Dict]]) -> int:
+        """Add tasks by key; keys already in the queue (in any state) are left alone."""
+        now = time.time()
+        added = 0
+        with self.transaction() as conn:
+            for key, payload in items:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO tasks (key, payload, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(payload), now),
+                )
+                added += cur.rowcount
+        return added
+
+    def claim(self, worker_id: str) -> Optional[Task]:
+        """Lease the next pending (or abandoned) task to `worker_id`."""
+        now = time.time()
+        with self.transaction() as conn:
+            # Abandoned tasks that already used up their attempts are given up on.
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', owner = NULL, updated_at = ?,"
+                " last_error = COALESCE(last_error, 'lease expired') "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT key, payload, attempts FROM tasks "
+                "WHERE status = 'pending' OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY attempts, key LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            key, payload, attempts = row
+            conn.execute(
+                "UPDATE tasks SET status = 'running', owner = ?, lease_expires = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                (worker_id, now + self.lease_seconds, now, key),
+            )
+        return Task(key=key, payload=json.loads(payload), attempts=attempts + 1)
+
+    def heartbeat(self, key: str, worker_id: str) -> bool:
+        """Extend the lease; False if the task is no longer ours."""
+        now = time.time()
+        with self.connect() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE key = ? AND owner = ? AND status = 'running'",
+                (now + self.lease_seconds, now, key, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, key: str, worker_id: str, result: Optional[Dict] = None) -> bool:
+        with self.connect() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET status = 'done', owner = NULL, lease_expires = NULL,"
+                " result = ?, last_error = NULL, updated_at = ? "
+                "WHERE key = ? AND owner = ? AND status = 'running'",
+                (json.dumps(result or {}), time.time(), key, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, key: str, worker_id: str, error: str) -> bool:
+        """Release a task after an error; it is retried until max_attempts is reached."""
+        with self.connect() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? "
+                "WHERE key = ? AND owner = ? AND status = 'running'",
+                (self.max_attempts, error[:2000], time.time(), key, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def retry_failed(self) -> int:
+        with self.connect() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, updated_at = ? WHERE status = 'failed'",
+                (time.time(),),
+            )
+            return cur.rowcount
+
+    @contextmanager
+    def leased(self, task: Task, worker_id: str) -> Iterator[threading.Event]:
+        """Keep renewing the task's lease in the background while the block runs.
+
+        The yielded event is set if the lease was lost (another worker took over).
+        """
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def beat() -> None:
+            interval = max(1.0, self.lease_seconds / 3)
+            while not stop.wait(interval):
+                try:
+                    if not self.heartbeat(task.key, worker_id):
+                        lost.set()
+                        return
+                except sqlite3.Error:
+                    # Transient lock/IO trouble; the next beat may succeed.
+                    continue
+
+        thread = threading.Thread(target=beat, name=f"lease-{task.key[:16]}", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
+
+    # Workers / reporting ------------------------------------------------------
+
+    def register_worker(self, worker_id: str) -> None:
+        """Record this worker and release leases held by dead workers on this host.
+
+        A restarted worker then resumes the files its crashed predecessor was on
+        right away instead of waiting for their leases to expire. Leases of a live
+        process are never touched, even one registered under the same worker_id.
+        """
+        now = time.time()
+        host = socket.gethostname()
+        with self.transaction() as conn:
+            local = conn.execute("SELECT worker_id, pid FROM workers WHERE host = ?", (host,)).fetchall()
+            for other_id, pid in local:
+                if not _pid_alive(pid):
+                    conn.execute(
+                        "UPDATE tasks SET lease_expires = 0 WHERE status = 'running' AND owner = ?",
+                        (other_id,),
+                    )
+            conn.execute(
+                "INSERT INTO workers (worker_id, host, pid, started_at, heartbeat_at, summary) "
+                "VALUES (?, ?, ?, ?, ?, '{}') "
+                "ON CONFLICT(worker_id) DO UPDATE SET host = excluded.host, pid = excluded.pid,"
+                " heartbeat_at = excluded.heartbeat_at",
+                (worker_id, host, os.getpid(), now, now),
+            )
+
+    def update_worker(self, worker_id: str, summary: Dict) -> None:
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE workers SET summary = ?, heartbeat_at = ? WHERE worker_id = ?",
+                (json.dumps(summary), time.time(), worker_id),
+            )
+
+    def report(self) -> Dict:
+        """Task counts by status plus worker summaries merged (numeric fields summed)."""
+        with self.connect() as conn:
+            statuses = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+            workers = conn.execute(
+                "SELECT worker_id, host, started_at, heartbeat_at, summary FROM workers ORDER BY worker_id"
+            ).fetchall()
+            failures = conn.execute(
+                "SELECT key, last_error FROM tasks WHERE status = 'failed' ORDER BY key LIMIT 20"
+            ).fetchall()
+
+        totals: Dict[str, float] = {}
+        per_worker = []
+        for worker_id, host, started_at, heartbeat_at, summary in workers:
+            data = json.loads(summary or "{}")
+            for name, value in data.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[name] = totals.get(name, 0) + value
+            per_worker.append(
+                {
+                    "worker_id": worker_id,
+                    "host": host,
+                    "seconds": round((heartbeat_at or started_at) - started_at, 1),
+                    **data,
+                }
+            )
+        return {
+            "tasks": statuses,
+            "totals": totals,
+            "workers": per_worker,
+            "failed": [{"key": k, "error": e} for k, e in failures],
+        }
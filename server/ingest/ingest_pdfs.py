@@ -4,9 +4,12 @@ import hashlib
 import json
 import os
 import sys
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 try:
     from dotenv import load_dotenv
@@ -20,11 +23,19 @@ except Exception as exc:
     raise
 
 try:
+    import pypdf
     from pypdf import PdfReader
 except Exception as exc:
     print("Missing dependency 'pypdf'. Install from requirements.txt", file=sys.stderr)
     raise
 
+# Shared helpers live in server/doctools
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from doctools.chunking import approx_counter, approx_tokens, chunk_pages, hf_token_counter, token_counter  # noqa: E402
+from doctools.page_cache import DEFAULT_MAX_BYTES, PageTextCache, default_cache_dir  # noqa: E402
+from doctools.tpuf_schema import chunk_schema  # noqa: E402
+from doctools.work_queue import WorkQueue, default_worker_id  # noqa: E402
+
 
 def log(msg: str) -> None:
     print(msg, file=sys.stdout)
@@ -53,16 +64,33 @@ def list_pdfs(directory: Path) -> List[Path]:
     return sorted(p for p in directory.rglob("*.pdf") if p.is_file())
 
 
-def extract_text_per_page(pdf_path: Path) -> List[str]:
+def iter_page_texts(pdf_path: Path) -> Iterable[str]:
     reader = PdfReader(str(pdf_path))
-    texts: List[str] = []
     for page in reader.pages:
         try:
             content = page.extract_text() or ""
         except Exception:
             content = ""
-        texts.append(content.strip())
-    return texts
+        yield content.strip()
+
+
+def extract_text_per_page(
+    pdf_path: Path,
+    text_cache: Optional[PageTextCache] = None,
+    file_bytes: Optional[bytes] = None,
+) -> List[str]:
+    if text_cache is None:
+        return list(iter_page_texts(pdf_path))
+    digest = hashlib.sha256(file_bytes).hexdigest() if file_bytes is not None else None
+    return list(
+        text_cache.iter_pages(
+            pdf_path,
+            backend="pypdf",
+            version=pypdf.__version__,
+            extract=iter_page_texts,
+            digest=digest,
+        )
+    )
 
 
 def chunk_text(text: str, max_len: int = 1800, overlap: int = 200) -> List[str]:
@@ -85,6 +113,76 @@ def chunk_text(text: str, max_len: int = 1800, overlap: int = 200) -> List[str]:
     return chunks
 
 
+# Per-chunk token budgets for the embedding models: mxbai-embed-large (Baseten)
+# truncates at 512 tokens; text-embedding-3-small accepts far more, but larger
+# chunks dilute retrieval.
+DEFAULT_CHUNK_TOKENS = {"baseten": 448, "openai": 512}
+BASETEN_EMBED_MODEL = "mixedbread-ai/mxbai-embed-large-v1"
+# mxbai's English WordPiece vocabulary splits Slovenian words into several
+# pieces, so without the real tokenizer assume fewer characters per token than
+# the ~4 typical of English and keep chunks safely under the 512-token limit.
+BASETEN_CHARS_PER_TOKEN = 2.5
+
+
+@lru_cache(maxsize=None)
+def embedding_token_counter(baseten: bool, offline: bool = False) -> Callable[[str], int]:
+    """Token counter matching the embedding model, with a conservative fallback.
+
+    offline (used by --dry-run) never downloads a tokenizer: the mxbai tokenizer
+    is only read from the local Hugging Face cache, and tiktoken (which fetches its
+    encodings on first use) is replaced by the ~4 characters per token estimate.
+    """
+    if not baseten:
+        return approx_tokens if offline else token_counter("cl100k_base")
+    counter = hf_token_counter(BASETEN_EMBED_MODEL, local_only=offline)
+    if counter is None:
+        reason = "not in the local cache" if offline else "needs 'tokenizers' and Hub access"
+        log(
+            f"Note: mxbai tokenizer unavailable ({reason}); estimating {BASETEN_CHARS_PER_TOKEN} characters per token "
+            "for chunk budgets"
+        )
+        counter = approx_counter(BASETEN_CHARS_PER_TOKEN)
+    return counter
+
+
+def iter_document_chunks(
+    pages: List[str],
+    *,
+    chunker: str,
+    chunk_tokens: int,
+    chunk_overlap_tokens: int,
+    chunk_size: int,
+    chunk_overlap: int,
+    count_tokens: Callable[[str], int],
+) -> Iterable[Tuple[int, int, int, str]]:
+    """Yield (page_start, page_end, chunk_index, text) for a document.
+
+    chunk_index counts chunks starting on page_start, so IDs stay (page, index).
+    "sentences" packs sentences across pages up to chunk_tokens; "chars" is the
+    original fixed-width window per page (chunk_size / chunk_overlap characters).
+    """
+    if chunker == "chars":
+        for page_index, page_text in enumerate(pages):
+            if not page_text:
+                continue
+            for chunk_index, text in enumerate(chunk_text(page_text, max_len=chunk_size, overlap=chunk_overlap)):
+                yield page_index + 1, page_index + 1, chunk_index, text
+        return
+
+    page = 0
+    chunk_index = 0
+    for chunk in chunk_pages(
+        pages,
+        max_tokens=chunk_tokens,
+        overlap_tokens=chunk_overlap_tokens,
+        count_tokens=count_tokens,
+    ):
+        if chunk.page_start != page:
+            page, chunk_index = chunk.page_start, 0
+        yield chunk.page_start, chunk.page_end, chunk_index, chunk.text
+        chunk_index += 1
+
+
 def stable_id(file_hash: str, page_num: int, chunk_index: int) -> str:
     base = f"{file_hash}::{page_num}::{chunk_index}"
     return hashlib.sha1(base.encode("utf-8")).hexdigest()
@@ -114,7 +212,7 @@ def embed_batch_baseten(api_key: str, texts: List[str]) -> List[List[float]]:
         "Content-Type": "application/json",
     }
     payload = {
-        "model": "mixedbread-ai/mxbai-embed-large-v1",
+        "model": BASETEN_EMBED_MODEL,
         "input": texts,
         "encoding_format": "float",
     }
@@ -129,6 +227,7 @@ def upsert_rows_turbopuffer(
     api_key: str,
     namespace: str,
     rows: List[Dict],
+    schema: Optional[Dict] = None,
 ) -> int:
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     # According to docs, namespaces are implicitly created on first write and
@@ -139,6 +238,9 @@ def upsert_rows_turbopuffer(
         # Required when writing vectors unless omitted or copying
         "distance_metric": "cosine_distance",
     }
+    if schema:
+        # Only declared-filterable attributes get a filter index (see doctools/tpuf_schema.py)
+        payload["schema"] = schema
     res = requests.post(url, headers=headers, json=payload, timeout=120)
     if res.status_code >= 400:
         raise RuntimeError(f"Upsert failed: {res.status_code} {res.text}")
@@ -150,6 +252,36 @@ def upsert_rows_turbopuffer(
         return 0
 
 
+def write_turbopuffer(api_key: str, namespace: str, payload: Dict) -> Dict:
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    url = f"https://api.turbopuffer.com/v2/namespaces/{namespace}"
+    res = requests.post(url, headers=headers, json=payload, timeout=120)
+    if res.status_code >= 400:
+        raise RuntimeError(f"Write failed: {res.status_code} {res.text}")
+    try:
+        return res.json()
+    except Exception:
+        return {}
+
+
+def delete_rows_turbopuffer(api_key: str, namespace: str, ids: List[str]) -> int:
+    deleted = 0
+    for i in range(0, len(ids), 1000):
+        batch = ids[i : i + 1000]
+        data = write_turbopuffer(api_key, namespace, {"deletes": batch})
+        deleted += int(data.get("rows_deleted") or data.get("rows_affected") or len(batch))
+    return deleted
+
+
+def patch_rows_turbopuffer(api_key: str, namespace: str, rows: List[Dict]) -> int:
+    patched = 0
+    for i in range(0, len(rows), 1000):
+        batch = rows[i : i + 1000]
+        data = write_turbopuffer(api_key, namespace, {"patch_rows": batch})
+        patched += int(data.get("rows_patched") or data.get("rows_affected") or len(batch))
+    return patched
+
+
 def ingest_pdf(
     pdf_path: Path,
     project_name: str,
@@ -164,11 +296,21 @@ def ingest_pdf(
     write_batch: int,
     chunk_size: int,
     chunk_overlap: int,
+    text_cache: Optional[PageTextCache] = None,
+    row_ids: Optional[List[str]] = None,
+    schema: Optional[Dict] = None,
+    chunker: str = "sentences",
+    chunk_tokens: Optional[int] = None,
+    chunk_overlap_tokens: int = 0,
+    snapshot=None,
 ) -> Tuple[int, int]:
     """
     Returns: (chunks_count, rows_written)
+    If row_ids is given, the ID of every generated row is appended to it.
+    schema, if given, is sent with every upsert.
+    chunk_tokens defaults to the embedding model's budget (DEFAULT_CHUNK_TOKENS).
+    snapshot (a snapshot.SnapshotWriter), if given, receives every written row.
     """
-    pages = extract_text_per_page(pdf_path)
     timestamp = datetime.now(tz=timezone.utc).isoformat()
     source_pdf = pdf_path.name
     # Use a file hash to keep IDs stable across file renames
@@ -177,64 +319,80 @@ def ingest_pdf(
     except Exception:
         file_bytes = b""
     file_hash = hashlib.sha1(file_bytes).hexdigest()
+    pages = extract_text_per_page(pdf_path, text_cache, file_bytes or None)
+    del file_bytes  # not needed past hashing; large PDFs would otherwise stay resident
 
     total_chunks = 0
     rows_buffer: List[Dict] = []
     rows_written = 0
 
-    for page_index, page_text in enumerate(pages):
-        if not page_text:
-            continue
-        chunks = chunk_text(page_text, max_len=chunk_size, overlap=chunk_overlap)
-        if not chunks:
-            continue
-        total_chunks += len(chunks)
-
-        # Embed in batches (unless dry-run)
-        for i in range(0, len(chunks), batch_embed):
-            batch = chunks[i : i + batch_embed]
-            vectors: List[List[float]]
-            if dry_run:
-                # Use zeros to avoid network usage in dry-run
-                vectors = [[0.0] * 1536 for _ in batch]
+    if chunk_tokens is None:
+        chunk_tokens = DEFAULT_CHUNK_TOKENS["baseten" if baseten_key else "openai"]
+    count_tokens = embedding_token_counter(bool(baseten_key), offline=dry_run)
+    chunks = iter_document_chunks(
+        pages,
+        chunker=chunker,
+        chunk_tokens=chunk_tokens,
+        chunk_overlap_tokens=chunk_overlap_tokens,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        count_tokens=count_tokens,
+    )
+
+    # Embed in batches across page boundaries (unless dry-run)
+    while True:
+        batch = list(islice(chunks, batch_embed))
+        if not batch:
+            break
+        total_chunks += len(batch)
+        texts = [text for _, _, _, text in batch]
+        vectors: List[List[float]]
+        if dry_run:
+            # Use zeros to avoid network usage in dry-run
+            vectors = [[0.0] * 1536 for _ in texts]
+        else:
+            if baseten_key:
+                vectors = embed_batch_baseten(baseten_key, texts)
+            elif openai_key:
+                vectors = embed_batch_openai(openai_key, texts)
             else:
-                if baseten_key:
-                    vectors = embed_batch_baseten(baseten_key, batch)
-                elif openai_key:
-                    vectors = embed_batch_openai(openai_key, batch)
-                else:
-                    raise RuntimeError("No API Key set (OPENAI_API_KEY or BASETEN_API_KEY) but embeddings are requested.")
-
-            for j, text in enumerate(batch):
-                chunk_index = i + j
-                row_id = stable_id(file_hash, page_index + 1, chunk_index)
-                content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
-                row = {
-                    "id": row_id,
-                    "projectName": project_name,
-                    "link": source_link,
-                    "source_pdf": source_pdf,
-                    "page_num": page_index + 1,
-                    "section": None,
-                    "chunk_index": chunk_index,
-                    "content": text,
-                    "vector": vectors[j],
-                    "content_hash": content_hash,
-                    "timestamp": timestamp,
-                }
-                rows_buffer.append(row)
-
-            # Flush in write batches
-            if not dry_run and len(rows_buffer) >= write_batch:
-                if not turbopuffer_key:
-                    raise RuntimeError("TURBOPUFFER_API_KEY is not set.")
-                # Use conditional upsert to avoid rewriting unchanged chunks
-                rows_written += upsert_rows_turbopuffer(
-                    turbopuffer_key,
-                    namespace,
-                    rows_buffer,
-                )
-                rows_buffer.clear()
+                raise RuntimeError("No API Key set (OPENAI_API_KEY or BASETEN_API_KEY) but embeddings are requested.")
+
+        for (page_start, page_end, chunk_index, text), vector in zip(batch, vectors):
+            row_id = stable_id(file_hash, page_start, chunk_index)
+            if row_ids is not None:
+                row_ids.append(row_id)
+            content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            row = {
+                "id": row_id,
+                "projectName": project_name,
+                "link": source_link,
+                "source_pdf": source_pdf,
+                "page_num": page_start,
+                "page_end": page_end,
+                "section": None,
+                "chunk_index": chunk_index,
+                "content": text,
+                "vector": vector,
+                "content_hash": content_hash,
+                "timestamp": timestamp,
+            }
+            rows_buffer.append(row)
+
+        # Flush in write batches
+        if not dry_run and len(rows_buffer) >= write_batch:
+            if not turbopuffer_key:
+                raise RuntimeError("TURBOPUFFER_API_KEY is not set.")
+            # Use conditional upsert to avoid rewriting unchanged chunks
+            rows_written += upsert_rows_turbopuffer(
+                turbopuffer_key,
+                namespace,
+                rows_buffer,
+                schema,
+            )
+            if snapshot is not None:
+                snapshot.add_rows(rows_buffer)
+            rows_buffer.clear()
 
     # Final flush
     if not dry_run and rows_buffer:
@@ -244,12 +402,242 @@ def ingest_pdf(
             turbopuffer_key,
             namespace,
             rows_buffer,
+            schema,
         )
+        if snapshot is not None:
+            snapshot.add_rows(rows_buffer)
         rows_buffer.clear()
 
     return total_chunks, rows_written
 
 
+def default_state_file(directory: Path, namespace: str) -> Path:
+    key = hashlib.sha1(f"{directory}::{namespace}".encode("utf-8")).hexdigest()[:12]
+    return Path.home() / ".cache" / "flowchat" / "ingest-state" / f"{namespace}-{key}.json"
+
+
+class DirectorySync:
+    """Keeps a namespace in step with a directory of PDFs, file by file.
+
+    A small state file maps each ingested path to its file hash, size/mtime and
+    row IDs, so unchanged files are skipped without hashing, modified files are
+    re-ingested (and their stale rows deleted), moved files only get their
+    `source_pdf` patched, and deleted files have their rows removed.
+    """
+
+    def __init__(self, directory: Path, state_file: Path, ingest_kwargs: Dict) -> None:
+        self.directory = directory
+        self.state_file = state_file
+        self.ingest_kwargs = ingest_kwargs
+        self.dry_run: bool = ingest_kwargs["dry_run"]
+        self.turbopuffer_key: Optional[str] = ingest_kwargs["turbopuffer_key"]
+        self.namespace: str = ingest_kwargs["namespace"]
+        self.state: Dict[str, Dict] = {}
+        if state_file.exists():
+            self.state = json.loads(state_file.read_text(encoding="utf-8"))
+
+    def save(self) -> None:
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_name(self.state_file.name + ".tmp")
+        tmp.write_text(json.dumps(self.state), encoding="utf-8")
+        os.replace(tmp, self.state_file)
+
+    def all_paths(self) -> Set[Path]:
+        return set(list_pdfs(self.directory)) | {Path(p) for p in self.state}
+
+    def paths_under(self, directory: Path) -> Set[Path]:
+        prefix = str(directory) + os.sep
+        known = {Path(p) for p in self.state if p.startswith(prefix)}
+        on_disk = set(list_pdfs(directory)) if directory.is_dir() else set()
+        return known | on_disk
+
+    def _delete(self, ids: List[str]) -> None:
+        if self.dry_run or not ids:
+            return
+        if not self.turbopuffer_key:
+            raise RuntimeError("TURBOPUFFER_API_KEY is not set.")
+        delete_rows_turbopuffer(self.turbopuffer_key, self.namespace, ids)
+
+    def _hash_in_use(self, file_hash: str, exclude: str) -> bool:
+        # Identical copies share row IDs; never delete rows another path still uses.
+        return any(r["file_hash"] == file_hash for p, r in self.state.items() if p != exclude)
+
+    def reconcile(self, candidates: Iterable[Path]) -> Dict[str, int]:
+        counts = {"ingested": 0, "moved": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+        candidates = set(candidates)
+        present = sorted(p for p in candidates if p.suffix == ".pdf" and p.is_file())
+        vanished = {str(p) for p in candidates if str(p) in self.state and not p.is_file()}
+        vanished_by_hash = {self.state[p]["file_hash"]: p for p in vanished}
+
+        for path in present:
+            key = str(path)
+            record = self.state.get(key)
+            try:
+                st = path.stat()
+                if record and record["size"] == st.st_size and record["mtime"] == st.st_mtime:
+                    counts["unchanged"] += 1
+                    continue
+                file_hash = hashlib.sha1(path.read_bytes()).hexdigest()
+                if record and record["file_hash"] == file_hash:
+                    record.update(size=st.st_size, mtime=st.st_mtime)
+                    counts["unchanged"] += 1
+                    self.save()
+                    continue
+
+                old_key = vanished_by_hash.pop(file_hash, None)
+                if record is None and old_key is not None:
+                    moved = self.state.pop(old_key)
+                    vanished.discard(old_key)
+                    if not self.dry_run and moved["ids"]:
+                        if not self.turbopuffer_key:
+                            raise RuntimeError("TURBOPUFFER_API_KEY is not set.")
+                        patch_rows_turbopuffer(
+                            self.turbopuffer_key,
+                            self.namespace,
+                            [{"id": row_id, "source_pdf": path.name} for row_id in moved["ids"]],
+                        )
+                    moved.update(size=st.st_size, mtime=st.st_mtime)
+                    self.state[key] = moved
+                    self.save()
+                    log(f"Moved: {old_key} -> {path} ({len(moved['ids'])} rows patched)")
+                    counts["moved"] += 1
+                    continue
+
+                ids: List[str] = []
+                chunks, written = ingest_pdf(pdf_path=path, row_ids=ids, **self.ingest_kwargs)
+                if record:
+                    stale = sorted(set(record["ids"]) - set(ids))
+                    if not self._hash_in_use(record["file_hash"], exclude=key):
+                        self._delete(stale)
+                self.state[key] = {
+                    "file_hash": file_hash,
+                    "size": st.st_size,
+                    "mtime": st.st_mtime,
+                    "ids": ids,
+                }
+                self.save()
+                log(f"Ingested: {path} -> chunks: {chunks}, rows_written: {written}")
+                counts["ingested"] += 1
+            except Exception as exc:
+                log(f"  !! failed: {path}: {exc}")
+                counts["failed"] += 1
+
+        for key in sorted(vanished):
+            record = self.state[key]
+            try:
+                if self._hash_in_use(record["file_hash"], exclude=key):
+                    del self.state[key]
+                    self.save()
+                    log(f"Removed: {key} (rows kept; an identical file is still present)")
+                else:
+                    self._delete(record["ids"])
+                    del self.state[key]
+                    self.save()
+                    log(f"Deleted: {key} ({len(record['ids'])} rows)")
+                counts["deleted"] += 1
+            except Exception as exc:
+                log(f"  !! failed to delete rows for {key}: {exc}")
+                counts["failed"] += 1
+        return counts
+
+    def watch(self, debounce: float, max_delay: float) -> None:
+        from watch import Debouncer, InotifyWatcher, WriteTracker
+
+        watcher = InotifyWatcher(self.directory)
+        debouncer = Debouncer(debounce, max_delay)
+        # New files wait for their writer to finish before they count as changed.
+        writes = WriteTracker(settle=max_delay)
+        log(json.dumps({"watching": str(self.directory), "state_file": str(self.state_file)}))
+        # Reconcile after the watch is in place so nothing changes unseen in between.
+        log(json.dumps(self.reconcile(self.all_paths())))
+        try:
+            while True:
+                timeouts = [t for t in (debouncer.timeout(), writes.timeout()) if t is not None]
+                for kind, path, is_dir in watcher.read(min(timeouts) if timeouts else None):
+                    if kind == "overflow":
+                        debouncer.request_rescan()
+                    elif is_dir:
+                        for candidate in self.paths_under(path):
+                            if kind == "created":
+                                # Copied in along with the new directory; may be incomplete.
+                                writes.created(candidate)
+                            else:
+                                debouncer.add(candidate)
+                        if kind != "deleted":
+                            debouncer.add(path)
+                    elif path.suffix == ".pdf":
+                        if kind == "created":
+                            writes.created(path)
+                            continue
+                        if kind in ("written", "deleted"):
+                            writes.finished(path)
+                        elif writes.is_open(path):
+                            continue
+                        debouncer.add(path)
+                for path in writes.pop_settled():
+                    debouncer.add(path)
+                batch = debouncer.pop_due()
+                if batch is None:
+                    continue
+                paths, rescan = batch
+                paths = self.all_paths() if rescan else {p for p in paths if p.suffix == ".pdf"}
+                paths = {p for p in paths if not writes.is_open(p)}
+                if paths:
+                    started = time.monotonic()
+                    counts = self.reconcile(paths)
+                    counts["seconds"] = round(time.monotonic() - started, 2)
+                    log(json.dumps(counts))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+
+
+def enqueue_pdfs(queue: WorkQueue, directory: Path, pdfs: List[Path]) -> int:
+    # Keyed by relative path + size + mtime: unchanged files are never queued twice,
+    # edited files get a fresh task on the next run.
+    items = []
+    for pdf_path in pdfs:
+        st = pdf_path.stat()
+        rel = pdf_path.relative_to(directory).as_posix()
+        items.append((f"{rel}:{st.st_size}:{st.st_mtime_ns}", {"path": rel}))
+    return queue.enqueue(items)
+
+
+def run_queue_worker(
+    queue: WorkQueue,
+    worker_id: str,
+    directory: Path,
+    ingest_kwargs: Dict,
+) -> Dict:
+    """Claim PDFs from the shared queue until it is empty; returns this worker's summary."""
+    queue.register_worker(worker_id)
+    summary = {"processed_pdfs": 0, "failed_pdfs": 0, "total_chunks": 0, "total_rows_written": 0}
+    while True:
+        task = queue.claim(worker_id)
+        if task is None:
+            break
+        pdf_path = directory / task.payload["path"]
+        log(f"[{worker_id}] Processing: {task.payload['path']} (attempt {task.attempts})")
+        try:
+            with queue.leased(task, worker_id) as lost:
+                chunks, written = ingest_pdf(pdf_path=pdf_path, **ingest_kwargs)
+            if lost.is_set() or not queue.complete(
+                task.key, worker_id, {"chunks": chunks, "rows_written": written}
+            ):
+                log(f"  !! lease lost for {task.payload['path']}; another worker owns it now")
+            summary["processed_pdfs"] += 1
+            summary["total_chunks"] += chunks
+            summary["total_rows_written"] += written
+            log(f"  -> chunks: {chunks}, rows_written: {written}")
+        except Exception as exc:
+            queue.fail(task.key, worker_id, str(exc))
+            summary["failed_pdfs"] += 1
+            log(f"  !! failed: {exc}")
+        queue.update_worker(worker_id, summary)
+    return summary
+
+
 def main():
     parser = argparse.ArgumentParser(description="Ingest PDFs into Turbopuffer.")
     parser.add_argument("--dir", required=True, help="Directory containing PDFs")
@@ -260,8 +648,82 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Do not call external APIs; no writes")
     parser.add_argument("--batch-embed", type=int, default=64, help="Embedding batch size")
     parser.add_argument("--write-batch", type=int, default=500, help="Rows per upsert batch")
-    parser.add_argument("--chunk-size", type=int, default=1800, help="Max characters per chunk")
-    parser.add_argument("--chunk-overlap", type=int, default=200, help="Characters overlap")
+    parser.add_argument(
+        "--chunker",
+        choices=["sentences", "chars"],
+        default="sentences",
+        help="sentences: sentence-aware chunks up to --chunk-tokens, spanning pages; chars: fixed character windows per page",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=None,
+        help=f"Token budget per chunk (default: {DEFAULT_CHUNK_TOKENS['baseten']} for Baseten, {DEFAULT_CHUNK_TOKENS['openai']} for OpenAI)",
+    )
+    parser.add_argument(
+        "--chunk-overlap-tokens", type=int, default=0, help="Repeat up to this many tokens of trailing sentences"
+    )
+    parser.add_argument("--chunk-size", type=int, default=1800, help="Max characters per chunk (--chunker chars)")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Characters overlap (--chunker chars)")
+    parser.add_argument(
+        "--text-cache-dir",
+        default=None,
+        help=f"Extracted page-text cache (default: $PAGE_TEXT_CACHE_DIR or {default_cache_dir()})",
+    )
+    parser.add_argument(
+        "--text-cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Evict least recently used cache entries beyond this size",
+    )
+    parser.add_argument("--no-text-cache", action="store_true", help="Always re-parse PDFs")
+    parser.add_argument(
+        "--full-text",
+        action="store_true",
+        help="Also build a full-text (BM25) index on chunk content",
+    )
+    parser.add_argument(
+        "--no-schema",
+        action="store_true",
+        help="Do not send the attribute schema (every attribute is then indexed for filtering)",
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help="Shared SQLite work queue; run this command in several processes/hosts to shard the ingest",
+    )
+    parser.add_argument("--worker-id", default=None, help="Worker name in the queue (default: host-pid)")
+    parser.add_argument(
+        "--lease-seconds", type=float, default=600.0, help="Queue lease; abandoned files are retried after it"
+    )
+    parser.add_argument("--max-attempts", type=int, default=3, help="Queue attempts per file before giving up")
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="Re-queue files that exhausted their attempts"
+    )
+    parser.add_argument(
+        "--queue-report", action="store_true", help="Print the merged report for --queue and exit"
+    )
+    parser.add_argument(
+        "--snapshot",
+        default=None,
+        help="Also write every ingested row to this snapshot file (see snapshot.py restore)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running: sync the directory, then re-ingest/delete PDFs as they change (inotify)",
+    )
+    parser.add_argument(
+        "--state-file",
+        default=None,
+        help="Per-file ingest state for --watch (default: ~/.cache/flowchat/ingest-state/...)",
+    )
+    parser.add_argument(
+        "--debounce-seconds", type=float, default=2.0, help="Quiet period before processing changes"
+    )
+    parser.add_argument(
+        "--max-delay-seconds", type=float, default=30.0, help="Process changes at most this late"
+    )
 
     args = parser.parse_args()
 
@@ -273,10 +735,83 @@ def main():
         print(f"Directory not found: {directory}", file=sys.stderr)
         sys.exit(1)
 
+    text_cache = None
+    if not args.no_text_cache:
+        text_cache = PageTextCache(
+            Path(args.text_cache_dir) if args.text_cache_dir else None,
+            max_bytes=args.text_cache_max_mb * 1024 * 1024,
+        )
+
+    schema = None if args.no_schema else chunk_schema(full_text_search=args.full_text)
+
+    # Shared by --watch and --queue; the one-shot loop below passes them explicitly.
+    ingest_kwargs = {
+        "project_name": args.project,
+        "source_link": args.link,
+        "openai_key": openai_key,
+        "baseten_key": baseten_key,
+        "turbopuffer_key": turbopuffer_key,
+        "namespace": namespace,
+        "dry_run": args.dry_run,
+        "batch_embed": args.batch_embed,
+        "write_batch": args.write_batch,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "chunker": args.chunker,
+        "chunk_tokens": args.chunk_tokens,
+        "chunk_overlap_tokens": args.chunk_overlap_tokens,
+        "text_cache": text_cache,
+        "schema": schema,
+    }
+
+    if args.snapshot and (args.watch or args.queue):
+        print("--snapshot is only supported for one-shot ingests (not --watch/--queue)", file=sys.stderr)
+        sys.exit(1)
+
+    if args.watch:
+        state_file = (
+            Path(args.state_file).expanduser()
+            if args.state_file
+            else default_state_file(directory, namespace)
+        )
+        DirectorySync(directory, state_file, ingest_kwargs).watch(
+            args.debounce_seconds, args.max_delay_seconds
+        )
+        return
+
     pdfs = list_pdfs(directory)
     if args.max_pdfs is not None:
         pdfs = pdfs[: args.max_pdfs]
 
+    if args.queue:
+        queue = WorkQueue(
+            Path(args.queue).expanduser(),
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+        )
+        if args.queue_report:
+            log(json.dumps(queue.report(), indent=2))
+            return
+        if args.retry_failed:
+            queue.retry_failed()
+        worker_id = args.worker_id or default_worker_id()
+        added = enqueue_pdfs(queue, directory, pdfs)
+        log(
+            json.dumps(
+                {
+                    "pdf_count": len(pdfs),
+                    "queued_new": added,
+                    "worker_id": worker_id,
+                    "namespace": namespace,
+                    "dry_run": args.dry_run,
+                }
+            )
+        )
+        summary = run_queue_worker(queue, worker_id, directory, ingest_kwargs)
+        log(json.dumps({"worker_id": worker_id, **summary}))
+        log(json.dumps(queue.report()))
+        return
+
     log(
         json.dumps(
             {
@@ -291,28 +826,49 @@ def main():
     total_chunks = 0
     total_written = 0
 
-    for idx, pdf_path in enumerate(pdfs, start=1):
-        log(f"Processing ({idx}/{len(pdfs)}): {pdf_path.name}")
-        try:
-            chunks, written = ingest_pdf(
-                pdf_path=pdf_path,
-                project_name=args.project,
-                source_link=args.link,
-                openai_key=openai_key,
-                baseten_key=baseten_key,
-                turbopuffer_key=turbopuffer_key,
-                namespace=namespace,
-                dry_run=args.dry_run,
-                batch_embed=args.batch_embed,
-                write_batch=args.write_batch,
-                chunk_size=args.chunk_size,
-                chunk_overlap=args.chunk_overlap,
-            )
-            total_chunks += chunks
-            total_written += written
-            log(f"  -> chunks: {chunks}, rows_written: {written}")
-        except Exception as exc:
-            log(f"  !! failed: {exc}")
+    snapshot = None
+    if args.snapshot and not args.dry_run:
+        from snapshot import SnapshotWriter
+
+        snapshot = SnapshotWriter(Path(args.snapshot).expanduser(), namespace=namespace, schema=schema)
+
+    # An interrupted or failed run must not leave a half-written .part snapshot behind.
+    try:
+        for idx, pdf_path in enumerate(pdfs, start=1):
+            log(f"Processing ({idx}/{len(pdfs)}): {pdf_path.name}")
+            try:
+                chunks, written = ingest_pdf(
+                    pdf_path=pdf_path,
+                    project_name=args.project,
+                    source_link=args.link,
+                    openai_key=openai_key,
+                    baseten_key=baseten_key,
+                    turbopuffer_key=turbopuffer_key,
+                    namespace=namespace,
+                    dry_run=args.dry_run,
+                    batch_embed=args.batch_embed,
+                    write_batch=args.write_batch,
+                    chunk_size=args.chunk_size,
+                    chunk_overlap=args.chunk_overlap,
+                    chunker=args.chunker,
+                    chunk_tokens=args.chunk_tokens,
+                    chunk_overlap_tokens=args.chunk_overlap_tokens,
+                    text_cache=text_cache,
+                    schema=schema,
+                    snapshot=snapshot,
+                )
+                total_chunks += chunks
+                total_written += written
+                log(f"  -> chunks: {chunks}, rows_written: {written}")
+            except Exception as exc:
+                log(f"  !! failed: {exc}")
+
+        if snapshot is not None:
+            snapshot.close()
+    except BaseException:
+        if snapshot is not None:
+            snapshot.abort()
+        raise
 
     summary = {
         "processed_pdfs": len(pdfs),
@@ -321,6 +877,11 @@ def main():
         "namespace": namespace,
         "dry_run": args.dry_run,
     }
+    if text_cache is not None:
+        summary["text_cache_hits"] = text_cache.hits
+        summary["text_cache_misses"] = text_cache.misses
+    if snapshot is not None:
+        summary["snapshot_rows"] = snapshot.rows
     log(json.dumps(summary))
 
 
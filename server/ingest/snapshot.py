@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""Columnar snapshots of Turbopuffer namespaces: export, restore, inspect.
+
+Rebuilding a namespace from PDFs costs an embedding call per chunk. A snapshot
+keeps the rows themselves (IDs, vectors, attributes), so a namespace can be
+restored or cloned with writes only:
+
+    python server/ingest/snapshot.py export --namespace NS --out ns.tpsnap
+    python server/ingest/snapshot.py restore --in ns.tpsnap --namespace NS_COPY
+    python server/ingest/snapshot.py info ns.tpsnap
+
+`ingest_pdfs.py --snapshot PATH` writes the same file while ingesting.
+
+File layout (all integers little-endian):
+
+    b"TPSNAP1\\n" | u32 len | header JSON (namespace, distance_metric, schema, ...)
+    block*      : b"BLK1" | u32 meta_len | u32 payload_len | meta JSON | payload
+    footer      : b"END1" | u32 meta_len | u32 0 | meta JSON (total rows, blocks)
+
+A block holds up to `block_rows` rows stored column by column: vectors as one
+contiguous float32 array ("f32", rows x dims), every other column as a
+zlib-compressed JSON list ("zjson"). Each block carries a CRC32 of its payload.
+Exports page through the namespace by ID, so they stream with bounded memory.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+try:
+    import requests
+except Exception as exc:
+    print("Missing dependency 'requests'. Install from requirements.txt", file=sys.stderr)
+    raise
+
+MAGIC = b"TPSNAP1\n"
+BLOCK_TAG = b"BLK1"
+FOOTER_TAG = b"END1"
+_U32 = struct.Struct("<I")
+_SECTION = struct.Struct("<4sII")  # tag, meta length, payload length
+DEFAULT_BLOCK_ROWS = 2000
+TURBOPUFFER_URL = "https://api.turbopuffer.com"
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class SnapshotWriter:
+    """Buffers rows (dicts with "id", "vector" and attributes) into column blocks."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        namespace: str,
+        distance_metric: str = "cosine_distance",
+        schema: Optional[Dict] = None,
+        block_rows: int = DEFAULT_BLOCK_ROWS,
+    ) -> None:
+        self.path = path
+        self.block_rows = max(1, block_rows)
+        self.rows = 0
+        self.blocks = 0
+        self._buffer: List[Dict] = []
+        self._part = path.with_name(path.name + ".part")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self._part.open("wb")
+        header = {
+            "version": 1,
+            "namespace": namespace,
+            "distance_metric": distance_metric,
+            "schema": schema or {},
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        }
+        data = json.dumps(header).encode("utf-8")
+        self._fh.write(MAGIC + _U32.pack(len(data)) + data)
+
+    def add_rows(self, rows: List[Dict]) -> None:
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self.block_rows:
+            self._write_block(self._buffer[: self.block_rows])
+            del self._buffer[: self.block_rows]
+
+    def _write_block(self, rows: List[Dict]) -> None:
+        names: List[str] = []
+        seen = set()
+        for row in rows:
+            for name in row:
+                if name not in seen and name not in ("id", "vector"):
+                    seen.add(name)
+                    names.append(name)
+
+        columns: List[Dict] = []
+        parts: List[bytes] = []
+        offset = 0
+
+        def add(name: str, encoding: str, data: bytes, **extra: Any) -> None:
+            nonlocal offset
+            columns.append({"name": name, "encoding": encoding, "offset": offset, "length": len(data), **extra})
+            parts.append(data)
+            offset += len(data)
+
+        add("id", "zjson", zlib.compress(json.dumps([row["id"] for row in rows]).encode("utf-8")))
+        vectors = [row.get("vector") for row in rows]
+        dims = len(vectors[0]) if isinstance(vectors[0], list) else 0
+        if dims and all(isinstance(v, list) and len(v) == dims for v in vectors):
+            flat = array("f")
+            for vector in vectors:
+                flat.extend(vector)
+            if sys.byteorder != "little":
+                flat.byteswap()
+            add("vector", "f32", flat.tobytes(), dims=dims)
+        elif any(v is not None for v in vectors):
+            add("vector", "zjson", zlib.compress(json.dumps(vectors).encode("utf-8")))
+        for name in names:
+            values = [row.get(name) for row in rows]
+            add(name, "zjson", zlib.compress(json.dumps(values, ensure_ascii=False).encode("utf-8"), 6))
+
+        payload = b"".join(parts)
+        meta = json.dumps({"rows": len(rows), "crc32": zlib.crc32(payload), "columns": columns}).encode("utf-8")
+        self._fh.write(_SECTION.pack(BLOCK_TAG, len(meta), len(payload)) + meta + payload)
+        self.rows += len(rows)
+        self.blocks += 1
+
+    def close(self) -> None:
+        if self._buffer:
+            self._write_block(self._buffer)
+            self._buffer = []
+        meta = json.dumps({"rows": self.rows, "blocks": self.blocks}).encode("utf-8")
+        self._fh.write(_SECTION.pack(FOOTER_TAG, len(meta), 0) + meta)
+        self._fh.close()
+        self._part.replace(self.path)
+
+    def abort(self) -> None:
+        self._fh.close()
+        self._part.unlink(missing_ok=True)
+
+
+def _read_exact(fh, size: int) -> bytes:
+    data = fh.read(size)
+    if len(data) != size:
+        raise SnapshotError("Truncated snapshot file")
+    return data
+
+
+def read_header(fh) -> Dict:
+    if fh.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("Not a snapshot file")
+    (length,) = _U32.unpack(_read_exact(fh, _U32.size))
+    return json.loads(_read_exact(fh, length))
+
+
+def iter_blocks(path: Path) -> Iterator[Dict[str, List]]:
+    """Yield blocks as {column name: values}; "vector" values are lists of floats."""
+    with path.open("rb") as fh:
+        read_header(fh)
+        while True:
+            tag, meta_len, payload_len = _SECTION.unpack(_read_exact(fh, _SECTION.size))
+            meta = json.loads(_read_exact(fh, meta_len))
+            if tag == FOOTER_TAG:
+                return
+            if tag != BLOCK_TAG:
+                raise SnapshotError(f"Unknown section {tag!r}")
+            payload = _read_exact(fh, payload_len)
+            if zlib.crc32(payload) != meta["crc32"]:
+                raise SnapshotError("Corrupt snapshot block (CRC mismatch)")
+            block: Dict[str, List] = {}
+            for column in meta["columns"]:
+                data = payload[column["offset"] : column["offset"] + column["length"]]
+                if column["encoding"] == "f32":
+                    flat = array("f")
+                    flat.frombytes(data)
+                    if sys.byteorder != "little":
+                        flat.byteswap()
+                    dims = column["dims"]
+                    block[column["name"]] = [flat[i : i + dims].tolist() for i in range(0, len(flat), dims)]
+                else:
+                    block[column["name"]] = json.loads(zlib.decompress(data))
+            yield block
+
+
+def snapshot_info(path: Path) -> Dict:
+    with path.open("rb") as fh:
+        header = read_header(fh)
+        fh.seek(0, 2)
+        size = fh.tell()
+    rows = blocks = 0
+    for block in iter_blocks(path):
+        rows += len(block["id"])
+        blocks += 1
+    return {**header, "rows": rows, "blocks": blocks, "bytes": size}
+
+
+def _headers(api_key: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+
+def fetch_schema(api_key: str, namespace: str) -> Dict:
+    res = requests.get(f"{TURBOPUFFER_URL}/v1/namespaces/{namespace}/schema", headers=_headers(api_key), timeout=60)
+    if res.status_code >= 400:
+        raise RuntimeError(f"Schema request failed: {res.status_code} {res.text}")
+    return res.json()
+
+
+def _decode_vector(value: Any) -> Any:
+    # Vectors may come back base64-encoded (float32 little-endian).
+    if isinstance(value, str):
+        import base64
+
+        flat = array("f")
+        flat.frombytes(base64.b64decode(value))
+        return flat.tolist()
+    return value
+
+
+def export_namespace(
+    api_key: str,
+    namespace: str,
+    out_path: Path,
+    *,
+    page_size: int = 1000,
+    distance_metric: str = "cosine_distance",
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> int:
+    """Page through the namespace in ID order and write every row; returns the row count."""
+    schema = fetch_schema(api_key, namespace)
+    attributes = ["vector"] + [name for name in schema if name not in ("id", "vector")]
+    writer = SnapshotWriter(
+        out_path, namespace=namespace, distance_metric=distance_metric, schema=schema, block_rows=block_rows
+    )
+    session = requests.Session()
+    last_id = None
+    exported = 0
+    try:
+        while True:
+            body: Dict[str, Any] = {
+                "rank_by": ["id", "asc"],
+                "top_k": page_size,
+                "include_attributes": attributes,
+            }
+            if last_id is not None:
+                body["filters"] = ["id", "Gt", last_id]
+            res = session.post(
+                f"{TURBOPUFFER_URL}/v2/namespaces/{namespace}/query",
+                headers=_headers(api_key),
+                json=body,
+                timeout=120,
+            )
+            if res.status_code >= 400:
+                raise RuntimeError(f"Export query failed: {res.status_code} {res.text}")
+            rows = res.json().get("rows", [])
+            for row in rows:
+                row.pop("$dist", None)
+                if "vector" in row:
+                    row["vector"] = _decode_vector(row["vector"])
+            writer.add_rows(rows)
+            exported += len(rows)
+            print(f"  exported {exported} rows", file=sys.stderr)
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1]["id"]
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.rows
+
+
+def _write_columns(api_key: str, namespace: str, payload: Dict, attempts: int = 5) -> int:
+    from ingest_pdfs import write_turbopuffer
+
+    delay = 1.0
+    for attempt in range(attempts):
+        try:
+            data = write_turbopuffer(api_key, namespace, payload)
+            return int(data.get("rows_upserted") or data.get("rows_affected") or len(payload["upsert_columns"]["id"]))
+        except (RuntimeError, requests.RequestException):
+            if attempt == attempts - 1:
+                raise
+            time.sleep(delay)
+            delay = min(30.0, delay * 2)
+    return 0
+
+
+def restore_snapshot(
+    api_key: str,
+    in_path: Path,
+    namespace: str,
+    *,
+    workers: int = 8,
+    batch_rows: int = 5000,
+    distance_metric: Optional[str] = None,
+) -> int:
+    """Upsert every row of the snapshot with parallel column-oriented writes."""
+    with in_path.open("rb") as fh:
+        header = read_header(fh)
+    schema = {name: spec for name, spec in (header.get("schema") or {}).items() if name != "id"}
+    metric = distance_metric or header.get("distance_metric") or "cosine_distance"
+
+    def batches() -> Iterator[Dict[str, List]]:
+        pending: Dict[str, List] = {}
+        count = 0
+        for block in iter_blocks(in_path):
+            n = len(block["id"])
+            for name in set(pending) | set(block):
+                pending.setdefault(name, [None] * count).extend(block.get(name) or [None] * n)
+            count += n
+            while count >= batch_rows:
+                yield {name: values[:batch_rows] for name, values in pending.items()}
+                pending = {name: values[batch_rows:] for name, values in pending.items()}
+                count -= batch_rows
+        if count:
+            yield pending
+
+    written = 0
+    in_flight: Deque[concurrent.futures.Future] = deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for columns in batches():
+            payload: Dict[str, Any] = {"upsert_columns": columns, "distance_metric": metric}
+            if schema:
+                payload["schema"] = schema
+            in_flight.append(executor.submit(_write_columns, api_key, namespace, payload))
+            while len(in_flight) >= 2 * max(1, workers):
+                written += in_flight.popleft().result()
+            print(f"  restored {written} rows", file=sys.stderr)
+        while in_flight:
+            written += in_flight.popleft().result()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/restore Turbopuffer namespaces as columnar snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Stream a namespace into a snapshot file")
+    export.add_argument("--namespace", default=None, help="Namespace (default: TURBOPUFFER_NAMESPACE)")
+    export.add_argument("--out", required=True, help="Snapshot file to write")
+    export.add_argument("--page-size", type=int, default=1000, help="Rows per export query")
+    export.add_argument("--block-rows", type=int, default=DEFAULT_BLOCK_ROWS, help="Rows per snapshot block")
+    export.add_argument("--distance-metric", default="cosine_distance", help="Recorded for restore")
+
+    restore = sub.add_parser("restore", help="Bulk-load a snapshot into a namespace")
+    restore.add_argument("--in", dest="in_path", required=True, help="Snapshot file to read")
+    restore.add_argument("--namespace", default=None, help="Target namespace (default: the snapshot's namespace)")
+    restore.add_argument("--workers", type=int, default=8, help="Parallel write requests")
+    restore.add_argument("--batch-rows", type=int, default=5000, help="Rows per write request")
+    restore.add_argument("--distance-metric", default=None, help="Override the recorded distance metric")
+
+    info = sub.add_parser("info", help="Print a snapshot's header and row count")
+    info.add_argument("path")
+
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print(json.dumps(snapshot_info(Path(args.path)), indent=2))
+        return
+
+    from ingest_pdfs import read_env
+
+    _, _, turbopuffer_key, env_namespace = read_env()
+    if not turbopuffer_key:
+        print("TURBOPUFFER_API_KEY is not set.", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.time()
+    if args.command == "export":
+        namespace = args.namespace or env_namespace
+        rows = export_namespace(
+            turbopuffer_key,
+            namespace,
+            Path(args.out).expanduser(),
+            page_size=args.page_size,
+            distance_metric=args.distance_metric,
+            block_rows=args.block_rows,
+        )
+        summary = {"exported_rows": rows, "namespace": namespace, "out": args.out}
+    else:
+        in_path = Path(args.in_path).expanduser()
+        with in_path.open("rb") as fh:
+            namespace = args.namespace or read_header(fh)["namespace"]
+        rows = restore_snapshot(
+            turbopuffer_key,
+            in_path,
+            namespace,
+            workers=args.workers,
+            batch_rows=args.batch_rows,
+            distance_metric=args.distance_metric,
+        )
+        summary = {"restored_rows": rows, "namespace": namespace, "in": args.in_path}
+    summary["seconds"] = round(time.time() - started, 1)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Linux inotify watcher with debouncing, used by `ingest_pdfs.py --watch`.
+
+Only the standard library is used (inotify via ctypes). The watcher blocks in
+poll() until the kernel reports an event, so an idle directory costs no CPU.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ATTRIB
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyError(OSError):
+    pass
+
+
+def _libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise InotifyError("inotify is not available on this platform (Linux only).")
+    return libc
+
+
+class InotifyWatcher:
+    """Recursive inotify watch over a directory tree.
+
+    `read(timeout)` returns changed paths as (kind, path, is_dir) tuples where
+    kind is "created" (content may still be arriving), "written" (closed after
+    writing, or moved into place), "changed" (attributes), "deleted" or
+    "overflow" (the kernel queue overflowed and the caller should rescan
+    everything).
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._libc = _libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise InotifyError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self._wd_to_dir: Dict[int, Path] = {}
+        self._poller = select.poll()
+        self._poller.register(self._fd, select.POLLIN)
+        self.add_tree(root)
+
+    def add_tree(self, directory: Path) -> None:
+        for dirpath, dirnames, _ in os.walk(directory):
+            self._add_watch(Path(dirpath))
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return  # vanished before we got to it
+            if err == errno.ENOSPC:
+                raise InotifyError(err, "inotify watch limit reached; raise fs.inotify.max_user_watches")
+            raise InotifyError(err, f"inotify_add_watch({directory}) failed: {os.strerror(err)}")
+        self._wd_to_dir[wd] = directory
+
+    def read(self, timeout: Optional[float]) -> List[Tuple[str, Path, bool]]:
+        """Wait up to `timeout` seconds (None = forever) and return pending events."""
+        ready = self._poller.poll(None if timeout is None else max(0, int(timeout * 1000)))
+        if not ready:
+            return []
+        events: List[Tuple[str, Path, bool]] = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            events.extend(self._parse(data))
+        return events
+
+    def _parse(self, data: bytes) -> Iterable[Tuple[str, Path, bool]]:
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            raw_name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                yield "overflow", self.root, True
+                continue
+            directory = self._wd_to_dir.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._wd_to_dir.pop(wd, None)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # Reported through the parent's IN_DELETE / IN_MOVED_FROM as well.
+                continue
+
+            path = directory / os.fsdecode(raw_name)
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                yield "deleted", path, is_dir
+                continue
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(path)
+            if mask & IN_CREATE:
+                yield "created", path, is_dir
+            elif mask & (IN_MOVED_TO | IN_CLOSE_WRITE):
+                yield "written", path, is_dir
+            elif mask & IN_ATTRIB:
+                yield "changed", path, is_dir
+
+    def close(self) -> None:
+        try:
+            self._poller.unregister(self._fd)
+        except (KeyError, ValueError):
+            pass
+        os.close(self._fd)
+
+
+class Debouncer:
+    """Coalesces bursts of path events into one batch.
+
+    A batch is released once no new event arrived for `quiet` seconds, or at the
+    latest `max_delay` seconds after its first event (so a file that keeps being
+    written to cannot postpone everything else forever).
+    """
+
+    def __init__(self, quiet: float, max_delay: float) -> None:
+        self.quiet = quiet
+        self.max_delay = max(max_delay, quiet)
+        self._paths: Set[Path] = set()
+        self._rescan = False
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def add(self, path: Path, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._paths.add(path)
+        self._touch(now)
+
+    def request_rescan(self, now: Optional[float] = None) -> None:
+        self._rescan = True
+        self._touch(time.monotonic() if now is None else now)
+
+    def _touch(self, now: float) -> None:
+        if self._first is None:
+            self._first = now
+        self._last = now
+
+    def timeout(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the pending batch is due; None when nothing is pending."""
+        if self._first is None or self._last is None:
+            return None
+        now = time.monotonic() if now is None else now
+        due = min(self._last + self.quiet, self._first + self.max_delay)
+        return max(0.0, due - now)
+
+    def pop_due(self, now: Optional[float] = None) -> Optional[Tuple[Set[Path], bool]]:
+        """Return (paths, rescan) if the batch is due, else None."""
+        remaining = self.timeout(now)
+        if remaining is None or remaining > 0:
+            return None
+        paths, rescan = self._paths, self._rescan
+        self._paths, self._rescan = set(), False
+        self._first = self._last = None
+        return paths, rescan
+
+
+class WriteTracker:
+    """Holds back files that were created but not finished yet.
+
+    A new file is released when its writer closes it (IN_CLOSE_WRITE) or it is
+    moved into place, so a large copy is not ingested half-written once the
+    debounce window passes. Files that never see a close (hard links, files that
+    were already inside a newly created directory) are released once their size
+    has not changed for `settle` seconds.
+    """
+
+    def __init__(self, settle: float) -> None:
+        self.settle = settle
+        self._open: Dict[Path, Tuple[int, float]] = {}  # path -> (size, when it last changed)
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return -1
+
+    def created(self, path: Path, now: Optional[float] = None) -> None:
+        self._open[path] = (self._size(path), time.monotonic() if now is None else now)
+
+    def finished(self, path: Path) -> None:
+        self._open.pop(path, None)
+
+    def is_open(self, path: Path) -> bool:
+        return path in self._open
+
+    def timeout(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next size check is due; None when nothing is held back."""
+        if not self._open:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(since for _, since in self._open.values()) + self.settle - now)
+
+    def pop_settled(self, now: Optional[float] = None) -> List[Path]:
+        """Release files whose size has been stable for `settle` seconds."""
+        now = time.monotonic() if now is None else now
+        settled: List[Path] = []
+        for path, (size, since) in list(self._open.items()):
+            if now - since < self.settle:
+                continue
+            current = self._size(path)
+            if current != size:
+                self._open[path] = (current, now)
+            else:
+                del self._open[path]
+                settled.append(path)
+        return settled
@@ -1,12 +1,77 @@
+import argparse
 import json
 import os
+import re
 import requests
 from dotenv import load_dotenv
 
-load_dotenv()
+from doctools.tpuf_schema import build_filters
 
-def query_bias_patterns():
+BASETEN_EMBED_URL = "https://model-7wl7dm7q.api.baseten.co/environments/production/predict"
+EMBED_MODEL = "mixedbread-ai/mxbai-embed-large-v1"
+TURBOPUFFER_NAMESPACES_URL = "https://api.turbopuffer.com/v2/namespaces"
+# Turbopuffer namespace names; anything else could rewrite the request path.
+NAMESPACE_RE = re.compile(r"[A-Za-z0-9_.-]{1,128}")
+
+
+def check_namespace(namespace):
+    """Return namespace if it is a valid Turbopuffer namespace name, else raise ValueError"""
+    if not isinstance(namespace, str) or not NAMESPACE_RE.fullmatch(namespace) or namespace in (".", ".."):
+        raise ValueError(f"Invalid namespace: {namespace!r}")
+    return namespace
+
+
+def embed_texts(texts, *, api_key, session=requests, timeout=30):
+    """Embed one or more texts with Baseten in a single call (order preserved)"""
+    res = session.post(
+        BASETEN_EMBED_URL,
+        headers={
+            "Authorization": f"Api-Key {api_key}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": EMBED_MODEL,
+            "input": list(texts),
+            "encoding_format": "float"
+        },
+        timeout=timeout
+    )
+    res.raise_for_status()
+    data = sorted(res.json()["data"], key=lambda item: item.get("index", 0))
+    return [item["embedding"] for item in data]
+
+
+def query_namespace(namespace, vector, *, api_key, top_k=4, filters=None, session=requests, timeout=30):
+    """ANN query against a Turbopuffer namespace; returns the matching rows
+
+    filters is {attribute: value or [values]} on filterable attributes, e.g.
+    {"projectName": "Lava Ridge"}; the search then only scans matching rows.
+    """
+    payload = {
+        "rank_by": ["vector", "ANN", vector],
+        "top_k": top_k,
+        "include_attributes": True
+    }
+    expression = build_filters(filters)
+    if expression is not None:
+        payload["filters"] = expression
+    response = session.post(
+        f"{TURBOPUFFER_NAMESPACES_URL}/{check_namespace(namespace)}/query",
+        headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        },
+        json=payload,
+        timeout=timeout
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Query failed: {response.status_code}")
+    return response.json().get("rows", [])
+
+
+def query_bias_patterns(filters=None):
     """Query Turbopuffer for bias patterns in manager responses"""
+    load_dotenv()
     print("🎯 Searching for bias patterns in Slack messages...")
     
     # Use Baseten for embedding if available, otherwise fall back to logic that requires an embedding function
@@ -27,51 +92,32 @@ def query_bias_patterns():
         
         # Create query embedding via Baseten
         try:
-            emb_res = requests.post(
-                "https://model-7wl7dm7q.api.baseten.co/environments/production/predict",
-                headers={
-                    "Authorization": f"Api-Key {baseten_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "mixedbread-ai/mxbai-embed-large-v1",
-                    "input": query,
-                    "encoding_format": "float"
-                },
-                timeout=30
-            )
-            emb_res.raise_for_status()
-            embedding = emb_res.json()["data"][0]["embedding"]
+            embedding = embed_texts([query], api_key=baseten_key)[0]
         except Exception as e:
             print(f"❌ Embedding generation failed: {e}")
             continue
         
         # Query Turbopuffer
-        response = requests.post(
-            "https://api.turbopuffer.com/v2/namespaces/complaint_demo/query",
-            headers={
-                "Authorization": f"Bearer {os.getenv('TURBOPUFFER_API_KEY')}", 
-                "Content-Type": "application/json"
-            },
-            json={
-                "rank_by": ["vector", "ANN", embedding], 
-                "top_k": 4, 
-                "include_attributes": True
-            }
-        )
+        try:
+            results = query_namespace(
+                "complaint_demo",
+                embedding,
+                api_key=os.getenv("TURBOPUFFER_API_KEY"),
+                top_k=4,
+                filters=filters,
+            )
+        except RuntimeError as e:
+            print(f"   ❌ {e}")
+            continue
+
+        all_results.extend(results)
         
-        if response.status_code == 200:
-            results = response.json().get("rows", [])
-            all_results.extend(results)
-            
-            print(f"   Found {len(results)} matches:")
-            for result in results:
-                content = result.get('content', '')[:60] + "..."
-                user = result.get('user', 'Unknown')
-                score = result.get('$dist', 0)
-                print(f"     • {user}: {content} (similarity: {score:.3f})")
-        else:
-            print(f"   ❌ Query failed: {response.status_code}")
+        print(f"   Found {len(results)} matches:")
+        for result in results:
+            content = result.get('content', '')[:60] + "..."
+            user = result.get('user', 'Unknown')
+            score = result.get('$dist', 0)
+            print(f"     • {user}: {content} (similarity: {score:.3f})")
     
     # Analyze the bias pattern
     # analyze_bias_pattern(all_results)
@@ -117,4 +163,8 @@ def analyze_bias_pattern(results):
     print(f"   • Revealed systematic discrimination in decision-making")
 
 if __name__ == "__main__":
-    query_bias_patterns()
+    parser = argparse.ArgumentParser(description="Query Turbopuffer for bias patterns")
+    parser.add_argument("--project", default=None, help="Only search chunks of this projectName")
+    parser.add_argument("--source-pdf", action="append", default=None, help="Only search these source PDFs (repeatable)")
+    args = parser.parse_args()
+    query_bias_patterns({"projectName": args.project, "source_pdf": args.source_pdf})
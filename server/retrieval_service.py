@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""Long-running retrieval service built on query.py's embedding + Turbopuffer query.
+
+Running query.py per question pays interpreter start-up, dotenv loading, fresh
+TLS handshakes and an embedding call every time. This service keeps all of that
+warm:
+
+- one pooled keep-alive `requests.Session` for Baseten and Turbopuffer, driven
+  from a thread pool so the event loop never blocks;
+- concurrent query embeddings are micro-batched into a single Baseten call
+  (requests arriving within `--batch-window-ms` share one round trip);
+- identical in-flight queries are coalesced (singleflight) and share one result.
+
+Endpoints:
+  POST /query    {"query": "...", "top_k": 4, "namespace": "...", "filters": {"projectName": "..."}}
+                 -> {"rows": [...], "took_ms": ...}
+  GET  /metrics  request counts, batch sizes and p50/p95/p99 latencies per stage
+  GET  /healthz  liveness probe
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+try:
+    from dotenv import load_dotenv
+except Exception:
+    load_dotenv = None
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except Exception as exc:
+    print("Missing dependency 'requests'. Install from requirements.txt", file=sys.stderr)
+    raise
+
+from doctools.tpuf_schema import build_filters
+from query import check_namespace, embed_texts, query_namespace
+
+MAX_BODY_BYTES = 1024 * 1024
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+
+class LatencyStats:
+    """Rolling window of recent latencies (ms) with percentile summaries."""
+
+    def __init__(self, window: int = 4096) -> None:
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, ms: float) -> None:
+        self.samples.append(ms)
+        self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"count": self.count}
+        ordered = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+
+        return {
+            "count": self.count,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1], 2),
+        }
+
+
+class SingleFlight:
+    """Callers asking for the same key while a call is in flight share its result."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(factory())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller disconnecting does not cancel the others' result.
+        return await asyncio.shield(fut)
+
+
+class EmbeddingBatcher:
+    """Collects texts for up to `window` seconds (or `max_batch` texts) per provider call."""
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+        *,
+        window: float,
+        max_batch: int,
+    ) -> None:
+        self._embed = embed
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks; hold them until they finish.
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.setdefault(text, []).append(fut)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        texts = list(batch)
+        self.batches += 1
+        self.texts += len(texts)
+        try:
+            vectors = await self._embed(texts)
+            if len(vectors) != len(texts):
+                raise RuntimeError(f"Embedding provider returned {len(vectors)} vectors for {len(texts)} inputs")
+        except Exception as exc:
+            for futures in batch.values():
+                for fut in futures:
+                    if not fut.done():
+                        fut.set_exception(exc)
+            return
+        for text, vector in zip(texts, vectors):
+            for fut in batch[text]:
+                if not fut.done():
+                    fut.set_result(vector)
+
+
+class RetrievalService:
+    def __init__(
+        self,
+        *,
+        baseten_key: str,
+        turbopuffer_key: str,
+        namespace: str,
+        default_top_k: int,
+        max_top_k: int,
+        pool_size: int,
+        batch_window: float,
+        max_batch: int,
+        timeout: float,
+    ) -> None:
+        self.baseten_key = baseten_key
+        self.turbopuffer_key = turbopuffer_key
+        self.namespace = namespace
+        self.default_top_k = default_top_k
+        self.max_top_k = max_top_k
+        self.timeout = timeout
+
+        # One session, one connection pool per upstream host, kept alive between requests.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="upstream")
+
+        self.batcher = EmbeddingBatcher(self._embed_batch, window=batch_window, max_batch=max_batch)
+        self.singleflight = SingleFlight()
+        self.latency = {name: LatencyStats() for name in ("request", "embed", "vector_query")}
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+
+    async def _blocking(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        t0 = time.perf_counter()
+        try:
+            return await self._blocking(
+                embed_texts, texts, api_key=self.baseten_key, session=self.session, timeout=self.timeout
+            )
+        finally:
+            self.latency["embed"].add((time.perf_counter() - t0) * 1000)
+
+    async def _retrieve(self, text: str, namespace: str, top_k: int, filters: Optional[Dict]) -> List[Dict]:
+        vector = await self.batcher.embed(text)
+        t0 = time.perf_counter()
+        try:
+            return await self._blocking(
+                query_namespace,
+                namespace,
+                vector,
+                api_key=self.turbopuffer_key,
+                top_k=top_k,
+                filters=filters,
+                session=self.session,
+                timeout=self.timeout,
+            )
+        finally:
+            self.latency["vector_query"].add((time.perf_counter() - t0) * 1000)
+
+    async def query(
+        self,
+        text: str,
+        *,
+        namespace: Optional[str] = None,
+        top_k: Optional[int] = None,
+        filters: Optional[Dict] = None,
+    ) -> List[Dict]:
+        namespace = check_namespace(namespace or self.namespace)
+        top_k = min(self.max_top_k, max(1, int(top_k or self.default_top_k)))
+        build_filters(filters)  # reject unknown attributes before any upstream call
+        key = (namespace, text, top_k, json.dumps(filters or {}, sort_keys=True))
+        return await self.singleflight.do(key, lambda: self._retrieve(text, namespace, top_k, filters))
+
+    def metrics(self) -> Dict:
+        batches = self.batcher.batches
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "coalesced": self.singleflight.coalesced,
+            "embed_batches": batches,
+            "embed_texts": self.batcher.texts,
+            "avg_embed_batch": round(self.batcher.texts / batches, 2) if batches else 0,
+            "latency": {name: stats.summary() for name, stats in self.latency.items()},
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def write_response(writer: asyncio.StreamWriter, status: int, payload: Dict, *, keep_alive: bool) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+async def dispatch(service: RetrievalService, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+    if path == "/healthz":
+        return 200, {"ok": True}
+    if path == "/metrics":
+        return 200, service.metrics()
+    if path != "/query":
+        raise HttpError(404, f"No route for {path}")
+    if method != "POST":
+        raise HttpError(405, "Use POST /query")
+
+    service.requests += 1
+    t0 = time.perf_counter()
+    try:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Body must be JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Body must be a JSON object")
+        text = data.get("query")
+        if not isinstance(text, str) or not text.strip():
+            raise HttpError(400, "'query' must be a non-empty string")
+        text = text.strip()
+        top_k = data.get("top_k")
+        if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool)):
+            raise HttpError(400, "'top_k' must be an integer")
+        namespace = data.get("namespace")
+        if namespace is not None and not isinstance(namespace, str):
+            raise HttpError(400, "'namespace' must be a string")
+        filters = data.get("filters")
+        if filters is not None and not isinstance(filters, dict):
+            raise HttpError(400, "'filters' must be an object")
+        try:
+            rows = await service.query(text, namespace=namespace, top_k=top_k, filters=filters)
+        except ValueError as exc:
+            raise HttpError(400, str(exc))
+        except (requests.RequestException, RuntimeError) as exc:
+            raise HttpError(502, str(exc))
+    except HttpError:
+        service.errors += 1
+        raise
+    took_ms = (time.perf_counter() - t0) * 1000
+    service.latency["request"].add(took_ms)
+    return 200, {"rows": rows, "took_ms": round(took_ms, 2)}
+
+
+async def handle_connection(service: RetrievalService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HttpError as exc:
+                write_response(writer, exc.status, {"error": str(exc)}, keep_alive=False)
+                break
+            if request is None:
+                break
+            method, target, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            try:
+                status, payload = await dispatch(service, method, urlsplit(target).path, body)
+            except HttpError as exc:
+                status, payload = exc.status, {"error": str(exc)}
+            except Exception as exc:
+                service.errors += 1
+                status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+            write_response(writer, status, payload, keep_alive=keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service: RetrievalService, host: str, port: int) -> None:
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    print(f"Retrieval service listening on http://{host}:{port} (namespace {service.namespace})", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    if load_dotenv is not None:
+        load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Serve retrieval queries (Baseten embeddings + Turbopuffer) over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--namespace", default=os.getenv("TURBOPUFFER_NAMESPACE") or "complaint_demo", help="Default namespace when a request does not name one")
+    parser.add_argument("--top-k", type=int, default=4, help="Default top_k when a request does not set one")
+    parser.add_argument("--max-top-k", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=16, help="Keep-alive connections per upstream host (and upstream threads)")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0, help="How long to collect concurrent queries into one embedding call")
+    parser.add_argument("--max-batch", type=int, default=32, help="Flush an embedding batch early once it holds this many distinct queries")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Upstream request timeout in seconds")
+    args = parser.parse_args()
+
+    baseten_key = os.getenv("BASETEN_API_KEY")
+    turbopuffer_key = os.getenv("TURBOPUFFER_API_KEY")
+    if not baseten_key or not turbopuffer_key:
+        print("BASETEN_API_KEY and TURBOPUFFER_API_KEY must be set", file=sys.stderr)
+        sys.exit(1)
+
+    service = RetrievalService(
+        baseten_key=baseten_key,
+        turbopuffer_key=turbopuffer_key,
+        namespace=args.namespace,
+        default_top_k=args.top_k,
+        max_top_k=args.max_top_k,
+        pool_size=args.pool_size,
+        batch_window=args.batch_window_ms / 1000.0,
+        max_batch=args.max_batch,
+        timeout=args.timeout,
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
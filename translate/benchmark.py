@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""Sweep translate_files.py concurrency and chunk size and recommend a configuration.
+
+Every combination of --workers, --chunk-workers and --max-chunk-chars is run over
+a sample corpus in its own process (so peak memory is per configuration), with
+the provider replaced by either
+
+- a mock translator with configurable latency, jitter, concurrency cap, request
+  rate limit and transient error rate (default; no network), or
+- the real OpenAI translator pointed at a local stand-in
+  (`--backend stub`, e.g. openai_stub_server.py via OPENAI_BASE_URL).
+
+Reported per configuration: documents/min, API calls, retries, per-call latency
+p50/p95/p99 and peak RSS. The fastest configuration wins; configurations within
+5% of it are tie-broken by fewer calls, then less concurrency, then less memory.
+
+	python translate/benchmark.py --latency 1.5 --rpm 500 --max-concurrency 16
+	python translate/benchmark.py --corpus ./samples --save bench.json
+	python translate/benchmark.py --baseline bench.json  # exit 1 on a throughput regression
+
+Extracted PDF text is cached (warm-up run first), so runs measure the translation
+pipeline, not PDF parsing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import translate_files as tf
+
+RETRY_ATTEMPTS = 6
+TIE_MARGIN = 0.05
+
+
+def percentile(values: list[float], p: float) -> float:
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class CallStats:
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self.calls = 0
+		self.retries = 0
+		self.throttled = 0
+		self.latencies: list[float] = []
+
+	def record(self, seconds: float) -> None:
+		with self._lock:
+			self.calls += 1
+			self.latencies.append(seconds)
+
+	def count_failure(self, throttled: bool) -> None:
+		with self._lock:
+			if throttled:
+				self.throttled += 1
+			else:
+				self.retries += 1
+
+	def summary(self) -> dict:
+		return {
+			"api_calls": self.calls,
+			"retries": self.retries,
+			"throttled": self.throttled,
+			"call_p50_s": round(percentile(self.latencies, 0.50), 3),
+			"call_p95_s": round(percentile(self.latencies, 0.95), 3),
+			"call_p99_s": round(percentile(self.latencies, 0.99), 3),
+		}
+
+
+class MockTranslator(tf.Translator):
+	"""Echoes the text back after a simulated provider delay.
+
+	Latency is `latency + per_kchar * len(text) / 1000`, scaled by a log-normal
+	jitter factor for a realistic tail. At most `max_concurrency` requests are
+	served at once (the rest queue); more than `rpm` requests per minute and
+	`error_rate` of requests fail and are retried with the same backoff as
+	OpenAITranslator.
+	"""
+
+	def __init__(
+		self,
+		*,
+		latency: float,
+		per_kchar: float,
+		jitter: float,
+		max_concurrency: int,
+		rpm: float,
+		error_rate: float,
+		seed: int = 0,
+	) -> None:
+		self.latency = latency
+		self.per_kchar = per_kchar
+		self.jitter = jitter
+		self.error_rate = error_rate
+		self.rpm = rpm
+		self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+		self._rng = random.Random(seed)
+		self._lock = threading.Lock()
+		self._tokens = rpm / 60.0 if rpm > 0 else 0.0
+		self._refilled = time.monotonic()
+		self.stats = CallStats()
+
+	def _take_rate_token(self) -> bool:
+		if self.rpm <= 0:
+			return True
+		with self._lock:
+			now = time.monotonic()
+			# Bucket holds at most one second's worth of requests.
+			self._tokens = min(self.rpm / 60.0, self._tokens + (now - self._refilled) * self.rpm / 60.0)
+			self._refilled = now
+			if self._tokens >= 1.0:
+				self._tokens -= 1.0
+				return True
+			return False
+
+	def translate(self, *, text: str, source_lang: str, target_lang: str) -> str:
+		start = time.perf_counter()
+		delay_seconds = 0.5
+		for attempt in range(RETRY_ATTEMPTS):
+			throttled = not self._take_rate_token()
+			if throttled:
+				failed = True
+			else:
+				with self._lock:
+					factor = self._rng.lognormvariate(0.0, self.jitter) if self.jitter > 0 else 1.0
+					failed = self._rng.random() < self.error_rate
+				with self._slots:
+					time.sleep((self.latency + self.per_kchar * len(text) / 1000.0) * factor)
+			if not failed:
+				self.stats.record(time.perf_counter() - start)
+				return text
+			# Each failed attempt is counted once, as the stub backend's HTTP hook does.
+			self.stats.count_failure(throttled=throttled)
+			if attempt == RETRY_ATTEMPTS - 1:
+				raise RuntimeError("mock provider: retries exhausted")
+			time.sleep(delay_seconds)
+			delay_seconds = min(8.0, delay_seconds * 2)
+		return text
+
+
+class InstrumentedTranslator(tf.Translator):
+	"""Counts and times the calls made through a real translator."""
+
+	def __init__(self, inner: tf.Translator) -> None:
+		self.inner = inner
+		self.stats = CallStats()
+
+	def translate(self, *, text: str, source_lang: str, target_lang: str) -> str:
+		start = time.perf_counter()
+		out = self.inner.translate(text=text, source_lang=source_lang, target_lang=target_lang)
+		self.stats.record(time.perf_counter() - start)
+		return out
+
+	def translate_segments(
+		self, segments: list[str], *, source_lang: str, target_lang: str
+	) -> list[str | None]:
+		start = time.perf_counter()
+		out = self.inner.translate_segments(segments, source_lang=source_lang, target_lang=target_lang)
+		self.stats.record(time.perf_counter() - start)
+		return out
+
+
+def count_http_failures(stats: CallStats) -> None:
+	"""Count 429s, 5xx responses and timeouts seen by the OpenAI SDK's HTTP client.
+
+	Both the SDK and OpenAITranslator retry these internally, so they never reach
+	InstrumentedTranslator; patching httpx in the child process is the only place
+	they are visible.
+	"""
+	import httpx
+
+	send = httpx.Client.send
+
+	def counted(self, request, **kwargs):
+		try:
+			response = send(self, request, **kwargs)
+		except httpx.TimeoutException:
+			stats.count_failure(throttled=False)
+			raise
+		if response.status_code == 429:
+			stats.count_failure(throttled=True)
+		elif response.status_code >= 500:
+			stats.count_failure(throttled=False)
+		return response
+
+	httpx.Client.send = counted
+
+
+def peak_rss_mb() -> float:
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# ru_maxrss is bytes on macOS, KiB on Linux.
+	return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_corpus(root: Path, *, docs: int, pages: int, seed: int = 0) -> None:
+	"""Synthetic Slovenian corpus: alternating text PDFs and .docx files."""
+	import langid
+
+	rng = random.Random(seed)
+	words = langid._SAMPLES["sl"].split()
+	root.mkdir(parents=True, exist_ok=True)
+
+	def paragraph() -> str:
+		sentences = []
+		for _ in range(rng.randint(2, 6)):
+			sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 20)))
+			sentences.append(sentence[0].upper() + sentence[1:].rstrip(".,") + ".")
+		return " ".join(sentences)
+
+	for i in range(docs):
+		paragraphs = [paragraph() for _ in range(pages * 6)]
+		if i % 2:
+			tf.write_docx(root / f"doc{i:03d}.docx", paragraphs)
+		else:
+			tf.write_pdf_from_text(root / f"doc{i:03d}.pdf", "\n\n".join(paragraphs))
+
+
+def run_one(spec: dict) -> dict:
+	"""Child process: one translate_files run for one configuration."""
+	argv = [
+		"--input-dir", spec["corpus"],
+		"--output-dir", spec["output_dir"],
+		"--overwrite",
+		"--pdf-output", "txt",
+		"--workers", str(spec["workers"]),
+		"--chunk-workers", str(spec["chunk_workers"]),
+		"--max-chunk-chars", str(spec["max_chunk_chars"]),
+		"--text-cache-dir", spec["cache_dir"],
+	]
+	if spec["stream"]:
+		argv.append("--stream")
+	args = tf.build_parser().parse_args(argv)
+
+	if spec["backend"] == "stub":
+		translator: MockTranslator | InstrumentedTranslator = InstrumentedTranslator(
+			tf.OpenAITranslator(model=spec["model"])
+		)
+		count_http_failures(translator.stats)
+	else:
+		translator = MockTranslator(**spec["mock"])
+
+	errors = io.StringIO()
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+		tf.run(args, lambda: translator)
+	elapsed = time.perf_counter() - start
+
+	out_dir = Path(spec["output_dir"])
+	docs_ok = sum(1 for p in out_dir.iterdir() if p.is_file() and not p.name.endswith(".part"))
+	return {
+		"workers": spec["workers"],
+		"chunk_workers": spec["chunk_workers"],
+		"max_chunk_chars": spec["max_chunk_chars"],
+		"docs": docs_ok,
+		"failed": errors.getvalue().count("Error translating"),
+		"seconds": round(elapsed, 2),
+		"docs_per_min": round(docs_ok / elapsed * 60.0, 2) if elapsed else 0.0,
+		"peak_rss_mb": round(peak_rss_mb(), 1),
+		**translator.stats.summary(),
+	}
+
+
+def spawn(spec: dict) -> dict:
+	proc = subprocess.run(
+		[sys.executable, str(Path(__file__).resolve()), "--child", json.dumps(spec)],
+		capture_output=True,
+		text=True,
+		check=False,
+	)
+	if proc.returncode != 0 or not proc.stdout.strip():
+		raise RuntimeError(f"benchmark run failed:\n{proc.stderr.strip()}")
+	return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def recommend(results: list[dict]) -> dict | None:
+	ok = [r for r in results if not r["failed"] and r["docs"]]
+	if not ok:
+		return None
+	best = max(r["docs_per_min"] for r in ok)
+	close = [r for r in ok if r["docs_per_min"] >= best * (1 - TIE_MARGIN)]
+	return min(
+		close,
+		key=lambda r: (r["api_calls"], r["workers"] * r["chunk_workers"], r["peak_rss_mb"]),
+	)
+
+
+def config_key(r: dict) -> tuple[int, int, int]:
+	return r["workers"], r["chunk_workers"], r["max_chunk_chars"]
+
+
+def compare_baseline(results: list[dict], baseline: list[dict], max_regression: float) -> list[str]:
+	before = {config_key(r): r for r in baseline}
+	problems = []
+	for r in results:
+		old = before.get(config_key(r))
+		if old is None or not old["docs_per_min"]:
+			continue
+		change = r["docs_per_min"] / old["docs_per_min"] - 1
+		if change < -max_regression:
+			problems.append(
+				f"workers={r['workers']} chunk_workers={r['chunk_workers']} "
+				f"max_chunk_chars={r['max_chunk_chars']}: {old['docs_per_min']} -> "
+				f"{r['docs_per_min']} docs/min ({change:+.0%})"
+			)
+	return problems
+
+
+def int_list(value: str) -> list[int]:
+	return [int(v) for v in value.split(",") if v.strip()]
+
+
+def format_row(r: dict) -> str:
+	return (
+		f"{r['workers']:>7} {r['chunk_workers']:>13} {r['max_chunk_chars']:>15} "
+		f"{r['docs_per_min']:>9} {r['api_calls']:>6} {r['retries'] + r['throttled']:>7} "
+		f"{r['call_p50_s']:>7} {r['call_p95_s']:>7} {r['call_p99_s']:>7} "
+		f"{r['peak_rss_mb']:>8} {r['failed']:>6}"
+	)
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(
+		description="Benchmark translate_files.py settings against a mock or stand-in provider."
+	)
+	parser.add_argument("--corpus", default="", help="Sample files to translate (default: synthetic corpus).")
+	parser.add_argument("--synthetic-docs", type=int, default=8, help="Documents in the synthetic corpus.")
+	parser.add_argument("--synthetic-pages", type=int, default=6, help="Pages per synthetic document.")
+	parser.add_argument("--workers", type=int_list, default=[1, 2, 4, 8], help="Comma-separated --workers values.")
+	parser.add_argument(
+		"--chunk-workers", type=int_list, default=[1, 4, 8], help="Comma-separated --chunk-workers values."
+	)
+	parser.add_argument(
+		"--max-chunk-chars", type=int_list, default=[2000, 3500, 6000], help="Comma-separated --max-chunk-chars values."
+	)
+	parser.add_argument("--stream", action="store_true", help="Benchmark --stream mode.")
+	parser.add_argument(
+		"--backend",
+		choices=["mock", "stub"],
+		default="mock",
+		help="mock: in-process simulated provider; stub: OpenAI translator against OPENAI_BASE_URL.",
+	)
+	parser.add_argument("--openai-model", default="gpt-4o-mini", help="Model name sent with --backend stub.")
+	parser.add_argument("--latency", type=float, default=0.8, help="Mock: base seconds per request.")
+	parser.add_argument("--per-kchar", type=float, default=0.3, help="Mock: extra seconds per 1000 characters.")
+	parser.add_argument("--jitter", type=float, default=0.3, help="Mock: log-normal sigma of the latency factor.")
+	parser.add_argument("--max-concurrency", type=int, default=32, help="Mock: requests served at once.")
+	parser.add_argument("--rpm", type=float, default=0, help="Mock: requests per minute before throttling (0 = none).")
+	parser.add_argument("--error-rate", type=float, default=0.0, help="Mock: fraction of requests failing transiently.")
+	parser.add_argument("--save", default="", help="Write results as JSON (usable as a later --baseline).")
+	parser.add_argument("--baseline", default="", help="Earlier --save output; exit 1 if any configuration regressed.")
+	parser.add_argument(
+		"--max-regression", type=float, default=0.15, help="Allowed docs/min drop vs --baseline (default: 0.15)."
+	)
+	parser.add_argument("--child", default="", help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.child:
+		print(json.dumps(run_one(json.loads(args.child))))
+		return 0
+
+	with tempfile.TemporaryDirectory(prefix="translate-bench-") as td:
+		work = Path(td)
+		corpus = Path(args.corpus).expanduser().resolve() if args.corpus else work / "corpus"
+		if not args.corpus:
+			make_corpus(corpus, docs=args.synthetic_docs, pages=args.synthetic_pages)
+		doc_count = sum(1 for _ in tf.iter_files(corpus))
+		if not doc_count:
+			tf.eprint(f"No supported files in {corpus}")
+			return 2
+
+		base_spec = {
+			"corpus": str(corpus),
+			"cache_dir": str(work / "text-cache"),
+			"stream": args.stream,
+			"backend": args.backend,
+			"model": args.openai_model,
+			"mock": {
+				"latency": args.latency,
+				"per_kchar": args.per_kchar,
+				"jitter": args.jitter,
+				"max_concurrency": args.max_concurrency,
+				"rpm": args.rpm,
+				"error_rate": args.error_rate,
+			},
+		}
+		configs = list(itertools.product(args.workers, args.chunk_workers, args.max_chunk_chars))
+		print(f"Corpus: {corpus} ({doc_count} files); {len(configs)} configurations, backend={args.backend}")
+
+		# Warm the page-text cache (with an instant mock) so PDF parsing does not
+		# favour later runs.
+		instant = {"latency": 0, "per_kchar": 0, "jitter": 0, "max_concurrency": 64, "rpm": 0, "error_rate": 0}
+		(work / "warmup").mkdir()
+		spawn(
+			{
+				**base_spec,
+				"backend": "mock",
+				"mock": instant,
+				"workers": 8,
+				"chunk_workers": 8,
+				"max_chunk_chars": 3500,
+				"output_dir": str(work / "warmup"),
+			}
+		)
+
+		print(
+			f"{'workers':>7} {'chunk_workers':>13} {'max_chunk_chars':>15} {'docs/min':>9} {'calls':>6} "
+			f"{'retries':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'rss MB':>8} {'failed':>6}"
+		)
+		results = []
+		for i, (workers, chunk_workers, max_chars) in enumerate(configs):
+			out_dir = work / f"out-{i}"
+			out_dir.mkdir()
+			result = spawn(
+				{
+					**base_spec,
+					"workers": workers,
+					"chunk_workers": chunk_workers,
+					"max_chunk_chars": max_chars,
+					"output_dir": str(out_dir),
+				}
+			)
+			results.append(result)
+			print(format_row(result), flush=True)
+
+	best = recommend(results)
+	if best is None:
+		print("No configuration translated the corpus without failures.")
+	else:
+		print(
+			f"\nRecommended: --workers {best['workers']} --chunk-workers {best['chunk_workers']} "
+			f"--max-chunk-chars {best['max_chunk_chars']} "
+			f"({best['docs_per_min']} docs/min, {best['api_calls']} calls, p99 {best['call_p99_s']} s)"
+		)
+
+	if args.save:
+		Path(args.save).write_text(json.dumps({"results": results, "recommended": best}, indent=2) + "\n")
+	if args.baseline:
+		baseline = json.loads(Path(args.baseline).read_text())["results"]
+		problems = compare_baseline(results, baseline, args.max_regression)
+		if problems:
+			print("\nThroughput regressions vs baseline:")
+			for line in problems:
+				print(f"  {line}")
+			return 1
+		print(f"\nNo regression beyond {args.max_regression:.0%} vs {args.baseline}.")
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,372 @@
+"""Streaming DOCX reading and writing for very large Word documents.
+
+python-docx loads the whole document part into an lxml tree and keeps it there.
+These helpers instead walk `word/document.xml` with `iterparse`, handling one
+top-level body element at a time and discarding it afterwards, so memory stays
+flat regardless of document length:
+
+- `iter_paragraph_texts` yields the text of each body paragraph (same paragraphs
+  and text as python-docx's `Document(path).paragraphs`).
+- `rewrite_docx` copies a package and replaces the text of each body paragraph
+  with the next item of an iterable, keeping paragraph styles, the first run's
+  formatting, images, tables, headers/footers and every other part.
+- `DocxStreamWriter` writes a new document paragraph by paragraph on top of
+  python-docx's default template (styles, settings, theme).
+"""
+
+from __future__ import annotations
+
+import copy
+import shutil
+import zipfile
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+DOCUMENT_PART = "word/document.xml"
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+
+
+def _w(tag: str) -> str:
+	return f"{{{W_NS}}}{tag}"
+
+
+_P, _R, _T, _BODY, _HYPERLINK = _w("p"), _w("r"), _w("t"), _w("body"), _w("hyperlink")
+_TEXT_TAGS = {
+	_w("t"): None,
+	_w("tab"): "\t",
+	_w("ptab"): "\t",
+	_w("cr"): "\n",
+	_w("noBreakHyphen"): "-",
+}
+_BR = _w("br")
+_RPR, _PPR = _w("rPr"), _w("pPr")
+
+
+def _run_text(run: ET.Element) -> str:
+	parts: list[str] = []
+	for child in run:
+		if child.tag == _T:
+			parts.append(child.text or "")
+		elif child.tag == _BR:
+			# Only line breaks become text; page/column breaks do not.
+			if child.get(_w("type"), "textWrapping") == "textWrapping":
+				parts.append("\n")
+		elif child.tag in _TEXT_TAGS:
+			parts.append(_TEXT_TAGS[child.tag] or "")
+	return "".join(parts)
+
+
+def _text_runs(paragraph: ET.Element) -> Iterator[tuple[ET.Element, ET.Element]]:
+	# Runs directly in the paragraph or inside hyperlinks, like python-docx's
+	# Paragraph.text; yields (parent, run).
+	for child in paragraph:
+		if child.tag == _R:
+			yield paragraph, child
+		elif child.tag == _HYPERLINK:
+			for run in child:
+				if run.tag == _R:
+					yield child, run
+
+
+def paragraph_text(paragraph: ET.Element) -> str:
+	return "".join(_run_text(run) for _, run in _text_runs(paragraph))
+
+
+def _is_text_child(child: ET.Element) -> bool:
+	return child.tag == _T or child.tag == _BR or child.tag in _TEXT_TAGS
+
+
+def _new_run(text: str, rpr: ET.Element | None) -> ET.Element:
+	run = ET.Element(_R)
+	if rpr is not None:
+		run.append(copy.deepcopy(rpr))
+	for line_index, line in enumerate(text.split("\n")):
+		if line_index:
+			ET.SubElement(run, _BR)
+		for part_index, part in enumerate(line.split("\t")):
+			if part_index:
+				ET.SubElement(run, _w("tab"))
+			if part:
+				t = ET.SubElement(run, _T)
+				t.text = part
+				t.set(f"{{{XML_NS}}}space", "preserve")
+	return run
+
+
+def set_paragraph_text(paragraph: ET.Element, text: str) -> None:
+	"""Replace a paragraph's text, keeping pPr, the first run's rPr and non-text content."""
+	first_rpr: ET.Element | None = None
+	insert_at: int | None = None
+	for parent, run in list(_text_runs(paragraph)):
+		text_children = [c for c in run if _is_text_child(c)]
+		if not text_children:
+			continue
+		if first_rpr is None:
+			first_rpr = run.find(_RPR)
+		if insert_at is None:
+			top = run if parent is paragraph else parent
+			insert_at = list(paragraph).index(top)
+		for child in text_children:
+			run.remove(child)
+		# Drop runs (and hyperlinks) that held nothing but text.
+		if all(c.tag == _RPR for c in run):
+			parent.remove(run)
+			if parent is not paragraph and not any(c.tag == _R for c in parent):
+				paragraph.remove(parent)
+
+	if insert_at is None:
+		children = list(paragraph)
+		insert_at = 1 if children and children[0].tag == _PPR else 0
+	insert_at = min(insert_at, len(paragraph))
+	paragraph.insert(insert_at, _new_run(text, first_rpr))
+
+
+def _quote(value: str) -> str:
+	return quoteattr(value, {"\n": "&#10;", "\r": "&#13;", "\t": "&#09;"})
+
+
+def _qname(name: str, prefixes: dict[str, str]) -> str:
+	if name.startswith("{"):
+		uri, local = name[1:].split("}", 1)
+		if uri == XML_NS:
+			return f"xml:{local}"
+		prefix = prefixes.get(uri, "")
+		return f"{prefix}:{local}" if prefix else local
+	return name
+
+
+def _open_tag(elem: ET.Element, prefixes: dict[str, str], declare: bool) -> str:
+	parts = [_qname(elem.tag, prefixes)]
+	if declare:
+		for uri, prefix in prefixes.items():
+			parts.append(f"xmlns:{prefix}={quoteattr(uri)}" if prefix else f"xmlns={quoteattr(uri)}")
+	for name, value in elem.attrib.items():
+		parts.append(f"{_qname(name, prefixes)}={_quote(value)}")
+	return "<" + " ".join(parts) + ">"
+
+
+def _serialize(elem: ET.Element, prefixes: dict[str, str], declared: set[str]) -> str:
+	"""Serialize a detached element using this document's prefixes.
+
+	ET.tostring would look prefixes up in ElementTree's module-global registry,
+	which documents processed on other threads may map differently. Namespaces
+	not in `declared` (the URIs declared on the root) are declared on `elem`.
+	"""
+	used: list[str] = []
+	for node in elem.iter():
+		for name in (node.tag, *node.attrib):
+			if name.startswith("{"):
+				uri = name[1:].split("}", 1)[0]
+				if uri != XML_NS and uri not in declared and uri not in used:
+					used.append(uri)
+	local: dict[str, str] = {}
+	if used:
+		taken = {prefixes[uri] for uri in declared if uri in prefixes}
+		for uri in used:
+			prefix = prefixes.get(uri, "")
+			n = 0
+			while not prefix or prefix in taken:
+				prefix = f"ns{n}"
+				n += 1
+			taken.add(prefix)
+			local[uri] = prefix
+	names = {**prefixes, **local}
+	parts: list[str] = []
+
+	def write(node: ET.Element, top: bool) -> None:
+		tag = _qname(node.tag, names)
+		attrs = [f"xmlns:{prefix}={quoteattr(uri)}" for uri, prefix in local.items()] if top else []
+		attrs.extend(f"{_qname(name, names)}={_quote(value)}" for name, value in node.attrib.items())
+		parts.append("<" + " ".join([tag, *attrs]))
+		if node.text or len(node):
+			parts.append(">")
+			if node.text:
+				parts.append(escape(node.text))
+			for child in node:
+				write(child, False)
+			parts.append(f"</{tag}>")
+		else:
+			parts.append("/>")
+		if node.tail and not top:
+			parts.append(escape(node.tail))
+
+	write(elem, True)
+	return "".join(parts)
+
+
+def _iter_body(source: IO[bytes]) -> Iterator[tuple[str, ET.Element, dict[str, str]]]:
+	"""Walk document.xml yielding (kind, element, prefixes).
+
+	kind is "root" / "body" when those elements start, "body_end" / "end" when
+	they end, and "child" for each complete top-level element.
+
+	"child" elements are body children or siblings of the body; they are detached
+	from the tree once the caller resumes.
+	"""
+	prefixes: dict[str, str] = {}
+	stack: list[ET.Element] = []
+	for event, item in ET.iterparse(source, events=("start-ns", "start", "end")):
+		if event == "start-ns":
+			prefix, uri = item
+			prefixes.setdefault(uri, prefix)
+			continue
+		elem = item
+		if event == "start":
+			stack.append(elem)
+			if len(stack) == 1:
+				yield "root", elem, prefixes
+			elif len(stack) == 2 and elem.tag == _BODY:
+				yield "body", elem, prefixes
+			continue
+
+		stack.pop()
+		depth = len(stack)
+		if depth == 0:
+			yield "end", elem, prefixes
+		elif (depth == 2 and stack[1].tag == _BODY) or (depth == 1 and elem.tag != _BODY):
+			yield "child", elem, prefixes
+			stack[-1].remove(elem)
+		elif depth == 1:
+			yield "body_end", elem, prefixes
+
+
+def iter_paragraph_texts(path: Path) -> Iterator[str]:
+	"""Yield the text of every body paragraph, one at a time."""
+	with zipfile.ZipFile(path) as zf, zf.open(DOCUMENT_PART) as source:
+		for kind, elem, _ in _iter_body(source):
+			if kind == "child" and elem.tag == _P:
+				yield paragraph_text(elem)
+
+
+def _copy_members(zin: zipfile.ZipFile, zout: zipfile.ZipFile, skip: set[str]) -> None:
+	for info in zin.infolist():
+		if info.filename in skip:
+			continue
+		out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+		out_info.compress_type = zipfile.ZIP_DEFLATED
+		out_info.external_attr = info.external_attr
+		with zin.open(info) as src, zout.open(out_info, "w") as dst:
+			shutil.copyfileobj(src, dst)
+
+
+def rewrite_docx(src: Path, dst: Path, paragraphs: Iterable[str]) -> int:
+	"""Copy `src` to `dst`, replacing body paragraph texts with `paragraphs` in order.
+
+	`paragraphs` must yield one item per body paragraph (as from iter_paragraph_texts);
+	it is consumed lazily while the output is written. Paragraphs that were empty in
+	the source, or whose replacement is their own text (e.g. passed through by the
+	language filter), are left untouched, runs and hyperlinks included. Returns the
+	number of paragraphs rewritten.
+	"""
+	replacements = iter(paragraphs)
+	rewritten = 0
+	with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
+		_copy_members(zin, zout, {DOCUMENT_PART})
+		with zin.open(DOCUMENT_PART) as source, zout.open(DOCUMENT_PART, "w") as raw:
+			out = _Utf8Writer(raw)
+			out.write(XML_DECLARATION)
+			declared: set[str] = set()
+			for kind, elem, prefixes in _iter_body(source):
+				if kind == "root":
+					declared = set(prefixes)
+					out.write(_open_tag(elem, prefixes, declare=True))
+				elif kind == "body":
+					out.write(_open_tag(elem, prefixes, declare=False))
+				elif kind == "child":
+					if elem.tag == _P:
+						replacement = next(replacements, None)
+						original = paragraph_text(elem).strip()
+						if replacement is not None and original and replacement.strip() != original:
+							set_paragraph_text(elem, replacement)
+							rewritten += 1
+					out.write(_serialize(elem, prefixes, declared))
+				elif kind == "body_end":
+					out.write(f"</{_qname(elem.tag, prefixes)}>")
+				elif kind == "end":
+					out.write(f"</{_qname(elem.tag, prefixes)}>")
+			out.flush()
+	return rewritten
+
+
+class _Utf8Writer:
+	# Small write buffer so ElementTree fragments are not written to the zip one by one.
+	def __init__(self, raw: IO[bytes], limit: int = 1 << 16) -> None:
+		self._raw = raw
+		self._parts: list[str] = []
+		self._size = 0
+		self._limit = limit
+
+	def write(self, text: str) -> None:
+		self._parts.append(text)
+		self._size += len(text)
+		if self._size >= self._limit:
+			self.flush()
+
+	def flush(self) -> None:
+		if self._parts:
+			self._raw.write("".join(self._parts).encode("utf-8"))
+			self._parts.clear()
+			self._size = 0
+
+	def close(self) -> None:
+		self.flush()
+		self._raw.close()
+
+
+def default_template() -> Path:
+	try:
+		import docx
+	except Exception as exc:  # pragma: no cover
+		raise RuntimeError("python-docx not installed. Install translate/requirements.txt.") from exc
+	return Path(docx.__file__).parent / "templates" / "default.docx"
+
+
+class DocxStreamWriter:
+	"""Writes a new .docx paragraph by paragraph without building a document in memory."""
+
+	def __init__(self, path: Path, *, template: Path | None = None) -> None:
+		template = template or default_template()
+		with zipfile.ZipFile(template) as zin:
+			root = ET.fromstring(zin.read(DOCUMENT_PART))
+			prefixes: dict[str, str] = {}
+			with zin.open(DOCUMENT_PART) as source:
+				for _, (prefix, uri) in ET.iterparse(source, events=("start-ns",)):
+					prefixes.setdefault(uri, prefix)
+			self._zout = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+			_copy_members(zin, self._zout, {DOCUMENT_PART})
+
+		body = root.find(_BODY)
+		sect_pr = body.find(_w("sectPr")) if body is not None else None
+		self._tail = (_serialize(sect_pr, prefixes, set(prefixes)) if sect_pr is not None else "") + (
+			f"</{_qname(_BODY, prefixes)}></{_qname(root.tag, prefixes)}>"
+		)
+		self._w = prefixes.get(W_NS, "w")
+		self._out = _Utf8Writer(self._zout.open(DOCUMENT_PART, "w"))
+		self._out.write(XML_DECLARATION)
+		self._out.write(_open_tag(root, prefixes, declare=True))
+		self._out.write(f"<{_qname(_BODY, prefixes)}>")
+
+	def add_paragraph(self, text: str) -> None:
+		w = self._w
+		if not text:
+			self._out.write(f"<{w}:p/>")
+			return
+		pieces: list[str] = []
+		for line_index, line in enumerate(text.split("\n")):
+			if line_index:
+				pieces.append(f"<{w}:br/>")
+			for part_index, part in enumerate(line.split("\t")):
+				if part_index:
+					pieces.append(f"<{w}:tab/>")
+				if part:
+					pieces.append(f'<{w}:t xml:space="preserve">{escape(part)}</{w}:t>')
+		self._out.write(f"<{w}:p><{w}:r>{''.join(pieces)}</{w}:r></{w}:p>")
+
+	def close(self) -> None:
+		self._out.write(self._tail)
+		self._out.close()
+		self._zout.close()
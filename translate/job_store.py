@@ -0,0 +1,86 @@
+"""Durable translation jobs for `translate_files.py --job-db`.
+
+Files are tasks in the shared SQLite work queue (server/doctools/work_queue.py):
+workers on one or several hosts claim them under a lease, and a crashed worker's
+file is picked up again once its lease expires. On top of that every translated
+chunk is checkpointed as soon as the provider returns it, keyed by a hash of the
+request, so a restarted file only sends the chunks that never came back.
+
+Checkpoints of a file are dropped once its output has been written.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from doctools.work_queue import WorkQueue
+
+_CHUNK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+	file_key TEXT NOT NULL,
+	chunk_key TEXT NOT NULL,
+	output TEXT NOT NULL,
+	worker_id TEXT,
+	updated_at REAL,
+	PRIMARY KEY (file_key, chunk_key)
+);
+"""
+
+
+def chunk_key(kind: str, source_lang: str, target_lang: str, payload: str | list[str]) -> str:
+	raw = json.dumps([kind, source_lang, target_lang, payload], ensure_ascii=False)
+	return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_task_key(path: Path, input_dir: Path) -> str:
+	# Relative path + size + mtime: hosts may mount the input tree at different
+	# places, and an edited file becomes a new job.
+	st = path.stat()
+	return f"{path.relative_to(input_dir).as_posix()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class JobStore(WorkQueue):
+	def __init__(self, path: Path, *, lease_seconds: float = 600.0, max_attempts: int = 3) -> None:
+		super().__init__(path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+		with self.connect() as conn:
+			conn.executescript(_CHUNK_SCHEMA)
+
+	def enqueue_files(self, files: list[Path], input_dir: Path) -> int:
+		return self.enqueue(
+			(file_task_key(p, input_dir), {"path": p.relative_to(input_dir).as_posix()})
+			for p in files
+		)
+
+	def load_chunks(self, file_key: str) -> dict[str, str]:
+		with self.connect() as conn:
+			rows = conn.execute(
+				"SELECT chunk_key, output FROM chunks WHERE file_key = ?", (file_key,)
+			).fetchall()
+		return dict(rows)
+
+	def save_chunk(self, file_key: str, key: str, output: str, worker_id: str) -> None:
+		with self.connect() as conn:
+			conn.execute(
+				"INSERT OR REPLACE INTO chunks (file_key, chunk_key, output, worker_id, updated_at) "
+				"VALUES (?, ?, ?, ?, ?)",
+				(file_key, key, output, worker_id, time.time()),
+			)
+
+	def complete(self, key: str, worker_id: str, result: dict | None = None) -> bool:
+		done = super().complete(key, worker_id, result)
+		if done:
+			with self.connect() as conn:
+				conn.execute("DELETE FROM chunks WHERE file_key = ?", (key,))
+		return done
+
+	def report(self) -> dict:
+		report = super().report()
+		with self.connect() as conn:
+			files, chunks = conn.execute(
+				"SELECT COUNT(DISTINCT file_key), COUNT(*) FROM chunks"
+			).fetchone()
+		report["checkpoints"] = {"files": files, "chunks": chunks}
+		return report
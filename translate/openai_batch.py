@@ -0,0 +1,321 @@
+"""OpenAI Batch API plumbing for `translate_files.py --mode batch`.
+
+Everything lives under one state directory so a run can be killed and resumed:
+
+	state.json              files planned, request files, submitted batches
+	plans/<key>.json        per-file source units needed to reassemble the output
+	requests/NNNN.jsonl     request lines, rolled at the Batch API size limits
+	results/<key>.jsonl     response content per custom_id, routed per input file
+
+Request ids are "<file key>:<request index>", so results can arrive in any order
+(and across several batches) and still be put back in document order. Requests
+of a failed or expired batch that got no usable result are copied into a new
+request file and resubmitted, up to a number of attempts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Batch API limits: 50k requests and 200 MB per input file (keep some headroom).
+MAX_REQUESTS_PER_FILE = 50_000
+MAX_BYTES_PER_FILE = 190 * 1024 * 1024
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def request_id(file_key: str, index: int) -> str:
+	return f"{file_key}:{index}"
+
+
+def _write_json_atomic(path: Path, data: Any) -> None:
+	tmp = path.with_name(path.name + ".tmp")
+	tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+	os.replace(tmp, path)
+
+
+class BatchStore:
+	"""On-disk state for one batch translation campaign."""
+
+	def __init__(self, root: Path) -> None:
+		self.root = root
+		self.plans_dir = root / "plans"
+		self.requests_dir = root / "requests"
+		self.results_dir = root / "results"
+		for d in (self.plans_dir, self.requests_dir, self.results_dir):
+			d.mkdir(parents=True, exist_ok=True)
+		self.state_path = root / "state.json"
+		if self.state_path.exists():
+			self.state = json.loads(self.state_path.read_text(encoding="utf-8"))
+		else:
+			self.state = {"files": {}, "request_files": []}
+		self._repair_request_files()
+
+	def save(self) -> None:
+		_write_json_atomic(self.state_path, self.state)
+
+	def _repair_request_files(self) -> None:
+		# A crash while planning can leave request lines that state.json never
+		# recorded; drop them so the file is re-planned without duplicate custom_ids.
+		known = {entry["name"]: entry for entry in self.state["request_files"]}
+		for path in self.requests_dir.glob("*.jsonl"):
+			entry = known.get(path.name)
+			if entry is None:
+				path.unlink()
+			elif "file_id" not in entry and path.stat().st_size > entry["bytes"]:
+				with path.open("r+b") as fh:
+					fh.truncate(entry["bytes"])
+
+	# Planning -----------------------------------------------------------------
+
+	@property
+	def files(self) -> dict[str, dict]:
+		return self.state["files"]
+
+	def has_file(self, key: str) -> bool:
+		return key in self.files
+
+	def drop_file(self, key: str) -> None:
+		"""Forget a file so it can be planned again under a new key.
+
+		Result lines still arriving for the old key are ignored by _route.
+		"""
+		self.files.pop(key, None)
+		self.save()
+		(self.plans_dir / f"{key}.json").unlink(missing_ok=True)
+		(self.results_dir / f"{key}.jsonl").unlink(missing_ok=True)
+
+	def add_file(self, key: str, record: dict, plan: dict, bodies: list[dict]) -> None:
+		"""Persist a file's plan and append its requests to the open request file."""
+		_write_json_atomic(self.plans_dir / f"{key}.json", plan)
+		for index, body in enumerate(bodies):
+			line = json.dumps(
+				{
+					"custom_id": request_id(key, index),
+					"method": "POST",
+					"url": BATCH_ENDPOINT,
+					"body": body,
+				},
+				ensure_ascii=False,
+			)
+			self._append_request_line(line, attempt=1)
+		self.files[key] = {**record, "requests": len(bodies), "status": "pending"}
+		self.save()
+
+	def load_plan(self, key: str) -> dict:
+		return json.loads((self.plans_dir / f"{key}.json").read_text(encoding="utf-8"))
+
+	def _append_request_line(self, line: str, *, attempt: int) -> None:
+		entries: list[dict] = self.state["request_files"]
+		current = entries[-1] if entries and "file_id" not in entries[-1] else None
+		size = len(line.encode("utf-8")) + 1
+		if current is None or (
+			current.get("attempt", 1) != attempt
+			or current["requests"] + 1 > MAX_REQUESTS_PER_FILE
+			or current["bytes"] + size > MAX_BYTES_PER_FILE
+		):
+			current = {
+				"name": f"{len(entries) + 1:04d}.jsonl",
+				"requests": 0,
+				"bytes": 0,
+				"attempt": attempt,
+			}
+			entries.append(current)
+		with (self.requests_dir / current["name"]).open("a", encoding="utf-8") as fh:
+			fh.write(line + "\n")
+		current["requests"] += 1
+		current["bytes"] += size
+
+	# Submission / polling -----------------------------------------------------
+
+	@property
+	def request_files(self) -> list[dict]:
+		return self.state["request_files"]
+
+	def submit(self, client: Any, *, completion_window: str = "24h") -> list[str]:
+		"""Upload and create a batch for every request file that has none yet."""
+		created: list[str] = []
+		for entry in self.request_files:
+			if entry.get("batch_id"):
+				continue
+			if "file_id" not in entry:
+				with (self.requests_dir / entry["name"]).open("rb") as fh:
+					uploaded = client.files.create(file=fh, purpose="batch")
+				# Recorded before creating the batch so a crash here never re-uploads
+				# and never appends new requests to an already-uploaded file.
+				entry["file_id"] = uploaded.id
+				self.save()
+			batch_id = self._find_existing_batch(client, entry["file_id"])
+			if batch_id is None:
+				batch = client.batches.create(
+					input_file_id=entry["file_id"],
+					endpoint=BATCH_ENDPOINT,
+					completion_window=completion_window,
+					metadata={"request_file": entry["name"]},
+				)
+				batch_id = batch.id
+				created.append(batch_id)
+			entry["batch_id"] = batch_id
+			entry["status"] = "validating"
+			self.save()
+		return created
+
+	@staticmethod
+	def _find_existing_batch(client: Any, file_id: str) -> str | None:
+		# A previous run may have died between batches.create and save().
+		for batch in client.batches.list(limit=100):
+			if getattr(batch, "input_file_id", None) == file_id:
+				return batch.id
+		return None
+
+	def refresh(self, client: Any) -> dict[str, int]:
+		"""Update the status of unfinished batches; returns a status histogram."""
+		counts: dict[str, int] = {}
+		for entry in self.request_files:
+			if not entry.get("batch_id"):
+				continue
+			if entry.get("status") not in TERMINAL_STATUSES:
+				batch = client.batches.retrieve(entry["batch_id"])
+				entry["status"] = batch.status
+				entry["output_file_id"] = batch.output_file_id
+				entry["error_file_id"] = batch.error_file_id
+			counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+		self.save()
+		return counts
+
+	def all_terminal(self) -> bool:
+		return all(entry.get("status") in TERMINAL_STATUSES for entry in self.request_files)
+
+	def wait(
+		self,
+		client: Any,
+		*,
+		poll_seconds: float,
+		log: Callable[[str], None] = print,
+	) -> None:
+		while True:
+			counts = self.refresh(client)
+			if self.all_terminal():
+				return
+			log(f"Batch status: {json.dumps(counts, sort_keys=True)}")
+			time.sleep(poll_seconds)
+
+	# Results ------------------------------------------------------------------
+
+	def collect(self, client: Any) -> int:
+		"""Route output/error lines of finished batches into per-file result files."""
+		routed = 0
+		for entry in self.request_files:
+			if entry.get("status") not in TERMINAL_STATUSES or entry.get("collected"):
+				continue
+			for file_id in (entry.get("output_file_id"), entry.get("error_file_id")):
+				if not file_id:
+					continue
+				routed += self._route(_iter_file_lines(client, file_id))
+			# Re-collecting after a crash only appends duplicates; readers keep the first.
+			entry["collected"] = True
+			self.save()
+		return routed
+
+	def resubmit_failed(self, *, max_attempts: int) -> int:
+		"""Copy requests of collected batches that have no usable result into new request files.
+
+		A request is sent in at most `max_attempts` batches; what still fails after
+		that is left to the caller. Returns how many requests were queued.
+		"""
+		results: dict[str, dict[int, str | None]] = {}
+		queued = 0
+		for entry in list(self.request_files):
+			if not entry.get("collected") or entry.get("resubmitted"):
+				continue
+			attempt = entry.get("attempt", 1)
+			if attempt < max_attempts:
+				with (self.requests_dir / entry["name"]).open(encoding="utf-8") as fh:
+					for line in fh:
+						if not line.strip():
+							continue
+						key, index = json.loads(line)["custom_id"].rsplit(":", 1)
+						if self.files.get(key, {}).get("status") != "pending":
+							continue
+						if key not in results:
+							results[key] = self.load_results(key)
+						if results[key].get(int(index)) is None:
+							self._append_request_line(line.rstrip("\n"), attempt=attempt + 1)
+							queued += 1
+			entry["resubmitted"] = True
+		# Lines and flags are saved together; a crash before this drops the new lines
+		# (see _repair_request_files) and the entries are resubmitted on the next run.
+		self.save()
+		return queued
+
+	def _route(self, lines: Iterator[str]) -> int:
+		handles: dict[str, Any] = {}
+		count = 0
+		try:
+			for line in lines:
+				if not line.strip():
+					continue
+				item = json.loads(line)
+				custom_id = item.get("custom_id") or ""
+				key = custom_id.split(":", 1)[0]
+				if key not in self.files:
+					continue
+				fh = handles.get(key)
+				if fh is None:
+					fh = handles[key] = (self.results_dir / f"{key}.jsonl").open(
+						"a", encoding="utf-8"
+					)
+				record = {"custom_id": custom_id, "content": response_content(item)}
+				fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+				count += 1
+		finally:
+			for fh in handles.values():
+				fh.close()
+		return count
+
+	def load_results(self, key: str) -> dict[int, str | None]:
+		"""Map request index -> response content (None for failed requests)."""
+		out: dict[int, str | None] = {}
+		path = self.results_dir / f"{key}.jsonl"
+		if not path.exists():
+			return out
+		with path.open(encoding="utf-8") as fh:
+			for line in fh:
+				if not line.strip():
+					continue
+				item = json.loads(line)
+				index = int(item["custom_id"].rsplit(":", 1)[1])
+				if out.get(index) is None:
+					out[index] = item.get("content")
+		return out
+
+	def mark(self, key: str, status: str, **fields: Any) -> None:
+		self.files[key].update(status=status, **fields)
+		self.save()
+
+
+def response_content(item: dict) -> str | None:
+	response = item.get("response") or {}
+	if item.get("error") or response.get("status_code") != 200:
+		return None
+	try:
+		content = response["body"]["choices"][0]["message"]["content"]
+	except (KeyError, IndexError, TypeError):
+		return None
+	return content.strip() if isinstance(content, str) else None
+
+
+def _iter_file_lines(client: Any, file_id: str) -> Iterator[str]:
+	content = client.files.content(file_id)
+	buffer = b""
+	for chunk in content.iter_bytes():
+		buffer += chunk
+		*lines, buffer = buffer.split(b"\n")
+		for line in lines:
+			yield line.decode("utf-8")
+	if buffer:
+		yield buffer.decode("utf-8")
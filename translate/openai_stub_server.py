@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenAI endpoints translate_files.py uses.
+
+Implements just enough of /v1/chat/completions, /v1/files and /v1/batches to run
+`--mode batch` (and sync mode) end to end without a real key or spend:
+
+	python translate/openai_stub_server.py --port 8765 &
+	OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub \\
+		python translate/translate_files.py --input-dir ./samples --mode batch --batch-poll-seconds 1
+
+"Translations" are the source text with a prefix on every line. Latency, rate-limit
+errors and dropped segments can be injected to exercise retry and re-request paths.
+"""
+
+from __future__ import annotations
+
+import argparse
+import email.parser
+import email.policy
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class StubState:
+	def __init__(
+		self,
+		*,
+		prefix: str,
+		latency: float,
+		error_rate: float,
+		drop_rate: float,
+		batch_delay: float,
+		batch_failure_rate: float,
+	) -> None:
+		self.prefix = prefix
+		self.latency = latency
+		self.error_rate = error_rate
+		self.drop_rate = drop_rate
+		self.batch_delay = batch_delay
+		self.batch_failure_rate = batch_failure_rate
+		self.files: dict[str, bytes] = {}
+		self.batches: dict[str, dict] = {}
+		self.lock = threading.Lock()
+		self.rng = random.Random(0)
+
+	def fake_translate(self, body: dict) -> str:
+		user = next(
+			(m["content"] for m in body.get("messages", []) if m.get("role") == "user"), ""
+		)
+		if (body.get("response_format") or {}).get("type") == "json_object":
+			segments = json.loads(user).get("segments", [])
+			with self.lock:
+				kept = [s for s in segments if self.rng.random() >= self.drop_rate]
+			return json.dumps(
+				{"segments": [{"id": s["id"], "text": self._prefix_lines(s["text"])} for s in kept]},
+				ensure_ascii=False,
+			)
+		return self._prefix_lines(user)
+
+	def _prefix_lines(self, text: str) -> str:
+		return "\n".join(f"{self.prefix}{line}" if line.strip() else line for line in text.split("\n"))
+
+	def completion(self, body: dict) -> dict:
+		return {
+			"id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+			"object": "chat.completion",
+			"created": int(time.time()),
+			"model": body.get("model", "stub"),
+			"choices": [
+				{
+					"index": 0,
+					"message": {"role": "assistant", "content": self.fake_translate(body)},
+					"finish_reason": "stop",
+				}
+			],
+			"usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+		}
+
+	def new_file(self, data: bytes, filename: str, purpose: str) -> dict:
+		file_id = f"file-{uuid.uuid4().hex[:16]}"
+		with self.lock:
+			self.files[file_id] = data
+		return {
+			"id": file_id,
+			"object": "file",
+			"bytes": len(data),
+			"created_at": int(time.time()),
+			"filename": filename,
+			"purpose": purpose,
+			"status": "processed",
+		}
+
+	def new_batch(self, body: dict) -> dict:
+		batch = {
+			"id": f"batch_{uuid.uuid4().hex[:16]}",
+			"object": "batch",
+			"endpoint": body.get("endpoint"),
+			"input_file_id": body.get("input_file_id"),
+			"completion_window": body.get("completion_window", "24h"),
+			"metadata": body.get("metadata"),
+			"status": "validating",
+			"created_at": int(time.time()),
+			"output_file_id": None,
+			"error_file_id": None,
+			"request_counts": {"total": 0, "completed": 0, "failed": 0},
+		}
+		with self.lock:
+			self.batches[batch["id"]] = batch
+		return batch
+
+	def advance(self, batch: dict) -> dict:
+		# Batches finish batch_delay seconds after creation, on the next poll.
+		if batch["status"] == "completed":
+			return batch
+		if time.time() - batch["created_at"] < self.batch_delay:
+			batch["status"] = "in_progress"
+			return batch
+		out_lines: list[str] = []
+		err_lines: list[str] = []
+		for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+			if not line.strip():
+				continue
+			item = json.loads(line)
+			with self.lock:
+				failed = self.rng.random() < self.batch_failure_rate
+			if failed:
+				err_lines.append(
+					json.dumps(
+						{
+							"id": f"batch_req_{uuid.uuid4().hex[:12]}",
+							"custom_id": item["custom_id"],
+							"response": None,
+							"error": {"code": "server_error", "message": "stub failure"},
+						}
+					)
+				)
+				continue
+			out_lines.append(
+				json.dumps(
+					{
+						"id": f"batch_req_{uuid.uuid4().hex[:12]}",
+						"custom_id": item["custom_id"],
+						"response": {"status_code": 200, "body": self.completion(item["body"])},
+						"error": None,
+					},
+					ensure_ascii=False,
+				)
+			)
+		# Real batches return results in arbitrary order.
+		with self.lock:
+			self.rng.shuffle(out_lines)
+		batch["output_file_id"] = self.new_file(
+			("\n".join(out_lines) + "\n").encode("utf-8"), "output.jsonl", "batch_output"
+		)["id"]
+		if err_lines:
+			batch["error_file_id"] = self.new_file(
+				("\n".join(err_lines) + "\n").encode("utf-8"), "errors.jsonl", "batch_output"
+			)["id"]
+		batch["request_counts"] = {
+			"total": len(out_lines) + len(err_lines),
+			"completed": len(out_lines),
+			"failed": len(err_lines),
+		}
+		batch["status"] = "completed"
+		return batch
+
+
+def make_handler(state: StubState) -> type[BaseHTTPRequestHandler]:
+	class Handler(BaseHTTPRequestHandler):
+		protocol_version = "HTTP/1.1"
+
+		def log_message(self, format: str, *args: Any) -> None:
+			pass
+
+		def _send_json(self, status: int, data: Any) -> None:
+			self._send_bytes(status, json.dumps(data).encode("utf-8"), "application/json")
+
+		def _send_bytes(self, status: int, data: bytes, content_type: str) -> None:
+			self.send_response(status)
+			self.send_header("Content-Type", content_type)
+			self.send_header("Content-Length", str(len(data)))
+			self.end_headers()
+			self.wfile.write(data)
+
+		def _body(self) -> bytes:
+			return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+		def do_GET(self) -> None:
+			path = self.path.split("?", 1)[0].rstrip("/")
+			parts = path.split("/")
+			if path == "/v1/batches":
+				with state.lock:
+					batches = list(state.batches.values())
+				data = [state.advance(b) for b in reversed(batches)]
+				self._send_json(200, {"object": "list", "data": data, "has_more": False})
+			elif path.startswith("/v1/batches/") and len(parts) == 4:
+				batch = state.batches.get(parts[3])
+				if batch is None:
+					self._send_json(404, {"error": {"message": "No such batch"}})
+				else:
+					self._send_json(200, state.advance(batch))
+			elif path.startswith("/v1/files/") and path.endswith("/content"):
+				data = state.files.get(parts[3])
+				if data is None:
+					self._send_json(404, {"error": {"message": "No such file"}})
+				else:
+					self._send_bytes(200, data, "application/octet-stream")
+			else:
+				self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+		def do_POST(self) -> None:
+			path = self.path.split("?", 1)[0].rstrip("/")
+			raw = self._body()
+			if path == "/v1/chat/completions":
+				if state.latency:
+					time.sleep(state.latency)
+				with state.lock:
+					throttled = state.rng.random() < state.error_rate
+				if throttled:
+					self._send_json(429, {"error": {"message": "stub rate limit", "type": "rate_limit"}})
+					return
+				self._send_json(200, state.completion(json.loads(raw)))
+			elif path == "/v1/files":
+				message = email.parser.BytesParser(policy=email.policy.default).parsebytes(
+					b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + raw
+				)
+				data, filename, purpose = b"", "upload.jsonl", "batch"
+				for part in message.iter_parts():
+					name = part.get_param("name", header="content-disposition")
+					if name == "file":
+						data = part.get_payload(decode=True) or b""
+						filename = part.get_filename() or filename
+					elif name == "purpose":
+						purpose = part.get_content().strip()
+				self._send_json(200, state.new_file(data, filename, purpose))
+			elif path == "/v1/batches":
+				self._send_json(200, state.new_batch(json.loads(raw)))
+			else:
+				self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+	return Handler
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI API (tests/benchmarks).")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--prefix", default="EN: ", help="Prefix added to every translated line.")
+	parser.add_argument("--latency", type=float, default=0.0, help="Seconds per chat completion.")
+	parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of completions answered with 429.")
+	parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of JSON segments dropped.")
+	parser.add_argument("--batch-delay", type=float, default=0.0, help="Seconds before a batch completes.")
+	parser.add_argument(
+		"--batch-failure-rate", type=float, default=0.0, help="Fraction of batch requests that fail."
+	)
+	args = parser.parse_args()
+
+	state = StubState(
+		prefix=args.prefix,
+		latency=args.latency,
+		error_rate=args.error_rate,
+		drop_rate=args.drop_rate,
+		batch_delay=args.batch_delay,
+		batch_failure_rate=args.batch_failure_rate,
+	)
+	server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+	print(f"OpenAI stand-in listening on http://{args.host}:{args.port}/v1")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -2,9 +2,14 @@
 from __future__ import annotations
 
 import argparse
+import collections
 import concurrent.futures
+import hashlib
 import importlib
+import itertools
+import json
 import os
+import re
 import shutil
 import subprocess
 import sys
@@ -13,11 +18,25 @@ import threading
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, TypeVar
 
 
+# Shared helpers live in server/doctools
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "server"))
+from doctools.chunking import chunk_pages  # noqa: E402
+from doctools.page_cache import DEFAULT_MAX_BYTES, PageTextCache, default_cache_dir  # noqa: E402
+from doctools.work_queue import default_worker_id  # noqa: E402
+
+if TYPE_CHECKING:
+	from job_store import JobStore
+
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".doc"}
 _OPENAI_THREAD_LOCAL = threading.local()
+# Set by main() unless --no-text-cache; read by iter_pdf_pages().
+PAGE_TEXT_CACHE: PageTextCache | None = None
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def eprint(message: str) -> None:
@@ -30,49 +49,106 @@ def iter_files(input_dir: Path) -> Iterable[Path]:
 			yield path
 
 
-def chunk_text(text: str, max_chars: int) -> list[str]:
-	# Chunk conservatively by paragraphs to preserve structure and avoid huge prompts.
-	paragraphs = [p.strip() for p in text.splitlines()]
-	chunks: list[str] = []
-	current: list[str] = []
-	current_len = 0
+def ordered_map(
+	fn: Callable[[T], R],
+	items: Iterable[T],
+	*,
+	workers: int,
+	max_pending: int,
+) -> Iterator[R]:
+	"""Like executor.map, but pulls items lazily and keeps at most max_pending in flight.
+
+	Results are yielded in input order; the queue of pending futures doubles as the
+	reorder buffer, so memory stays bounded no matter how many items there are.
+	"""
+	pending: collections.deque[concurrent.futures.Future[R]] = collections.deque()
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		for item in items:
+			pending.append(executor.submit(fn, item))
+			while len(pending) >= max(1, max_pending):
+				yield pending.popleft().result()
+		while pending:
+			yield pending.popleft().result()
+
+
+SEGMENT_MARKER_RE = re.compile(r"^\s*\[\[(\d+)\]\]\s?(.*)$")
+
+
+def format_marked_segments(segments: list[str]) -> str:
+	# One "[[n]] text" line per segment (ids are 1-based within the request).
+	return "\n".join(f"[[{i}]] {text}" for i, text in enumerate(segments, start=1))
+
+
+def parse_marked_segments(text: str, count: int) -> list[str | None]:
+	# Lines without a marker continue the previous segment (multi-line paragraphs).
+	found: dict[int, list[str]] = {}
+	current: list[str] | None = None
+	for line in text.splitlines():
+		match = SEGMENT_MARKER_RE.match(line)
+		if match:
+			seg_id = int(match.group(1))
+			if 1 <= seg_id <= count and seg_id not in found:
+				current = found[seg_id] = [match.group(2)]
+			else:
+				current = None
+			continue
+		if current is not None:
+			current.append(line)
+
+	out: list[str | None] = []
+	for seg_id in range(1, count + 1):
+		lines = found.get(seg_id)
+		value = "\n".join(lines).strip() if lines is not None else ""
+		out.append(value or None)
+	return out
 
-	for p in paragraphs:
-		if not p:
-			# Preserve empty lines as separators.
-			p = ""
-		add_len = len(p) + 1
+
+def pack_segments(segments: list[str], max_chars: int) -> list[list[int]]:
+	# Greedily pack segment indices into requests of at most max_chars characters.
+	# A single oversized segment still gets a request of its own.
+	batches: list[list[int]] = []
+	current: list[int] = []
+	current_len = 0
+	for idx, text in enumerate(segments):
+		add_len = len(text) + 8  # room for the "[[n]] " marker and newline
 		if current and current_len + add_len > max_chars:
-			chunks.append("\n".join(current).strip("\n"))
+			batches.append(current)
 			current = []
 			current_len = 0
-		current.append(p)
+		current.append(idx)
 		current_len += add_len
-
 	if current:
-		chunks.append("\n".join(current).strip("\n"))
-
-	# Avoid empty chunks.
-	return [c for c in chunks if c.strip()]
+		batches.append(current)
+	return batches
 
 
 class Translator:
 	def translate(self, *, text: str, source_lang: str, target_lang: str) -> str:
 		raise NotImplementedError
 
+	def translate_segments(
+		self, segments: list[str], *, source_lang: str, target_lang: str
+	) -> list[str | None]:
+		"""Translate segments in one request; None marks a segment the response dropped."""
+		translated = self.translate(
+			text=format_marked_segments(segments),
+			source_lang=source_lang,
+			target_lang=target_lang,
+		)
+		return parse_marked_segments(translated, len(segments))
+
 
 @dataclass(frozen=True)
 class OpenAITranslator(Translator):
 	model: str
 
-	def translate(self, *, text: str, source_lang: str, target_lang: str) -> str:
+	def _client(self):
 		api_key = os.getenv("OPENAI_API_KEY")
 		if not api_key:
 			raise RuntimeError("OPENAI_API_KEY is not set.")
 
 		try:
 			from openai import OpenAI
-			from openai import APIError, APITimeoutError, RateLimitError
 		except Exception as exc:  # pragma: no cover
 			raise RuntimeError(
 				"OpenAI SDK not installed. Install translate/requirements.txt."
@@ -82,24 +158,61 @@ class OpenAITranslator(Translator):
 		if client is None:
 			client = OpenAI(api_key=api_key)
 			_OPENAI_THREAD_LOCAL.client = client
-
+		return client
+
+	def chat_request(self, *, system: str, user: str, json_mode: bool = False) -> dict:
+		# Request body shared by synchronous calls and --mode batch request lines.
+		body: dict = {
+			"model": self.model,
+			"messages": [
+				{"role": "system", "content": system},
+				{"role": "user", "content": user},
+			],
+			"temperature": 0,
+		}
+		if json_mode:
+			body["response_format"] = {"type": "json_object"}
+		return body
+
+	def translation_request(self, *, text: str, source_lang: str, target_lang: str) -> dict:
 		system = (
 			"You are a professional translator. Translate the provided text "
 			f"from {source_lang} to {target_lang}. Preserve meaning and paragraph breaks. "
 			"Do not add notes, disclaimers, or commentary. Output only the translated text."
 		)
+		return self.chat_request(system=system, user=text)
+
+	def segments_request(
+		self, segments: list[str], *, source_lang: str, target_lang: str
+	) -> dict:
+		# JSON mode keeps segment ids machine-checkable instead of relying on line counts.
+		system = (
+			"You are a professional translator. The user sends a JSON object "
+			'{"segments": [{"id": <int>, "text": <string>}, ...]}. '
+			f"Translate every segment's text from {source_lang} to {target_lang}. "
+			'Reply with a JSON object {"segments": [{"id": <int>, "text": <string>}, ...]} '
+			"containing each id exactly once. Translate each segment on its own; never merge, "
+			"split, or drop segments. Do not add notes, disclaimers, or commentary."
+		)
+		payload = {
+			"segments": [
+				{"id": i, "text": text} for i, text in enumerate(segments, start=1)
+			]
+		}
+		return self.chat_request(
+			system=system,
+			user=json.dumps(payload, ensure_ascii=False),
+			json_mode=True,
+		)
+
+	def _complete(self, body: dict) -> str:
+		client = self._client()
+		from openai import APIError, APITimeoutError, RateLimitError
 
 		delay_seconds = 0.5
 		for attempt in range(6):
 			try:
-				resp = client.chat.completions.create(
-					model=self.model,
-					messages=[
-						{"role": "system", "content": system},
-						{"role": "user", "content": text},
-					],
-					temperature=0,
-				)
+				resp = client.chat.completions.create(**body)
 				content = resp.choices[0].message.content
 				if not content:
 					return ""
@@ -115,6 +228,42 @@ class OpenAITranslator(Translator):
 
 		return ""
 
+	def translate(self, *, text: str, source_lang: str, target_lang: str) -> str:
+		return self._complete(
+			self.translation_request(text=text, source_lang=source_lang, target_lang=target_lang)
+		)
+
+	def translate_segments(
+		self, segments: list[str], *, source_lang: str, target_lang: str
+	) -> list[str | None]:
+		content = self._complete(
+			self.segments_request(segments, source_lang=source_lang, target_lang=target_lang)
+		)
+		return parse_json_segments(content, len(segments))
+
+
+def parse_json_segments(content: str, count: int) -> list[str | None]:
+	out: list[str | None] = [None] * count
+	try:
+		data = json.loads(content)
+	except ValueError:
+		return out
+	items = data.get("segments") if isinstance(data, dict) else None
+	if not isinstance(items, list):
+		return out
+	for item in items:
+		if not isinstance(item, dict):
+			continue
+		seg_id = item.get("id")
+		text = item.get("text")
+		if isinstance(seg_id, str) and seg_id.isdigit():
+			seg_id = int(seg_id)
+		if not isinstance(seg_id, int) or not 1 <= seg_id <= count:
+			continue
+		if isinstance(text, str) and text.strip() and out[seg_id - 1] is None:
+			out[seg_id - 1] = text.strip()
+	return out
+
 
 @dataclass(frozen=True)
 class ArgosTranslator(Translator):
@@ -143,6 +292,144 @@ class ArgosTranslator(Translator):
 		translation = source.get_translation(target)
 		return translation.translate(text)
 
+	def translate_segments(
+		self, segments: list[str], *, source_lang: str, target_lang: str
+	) -> list[str | None]:
+		# Local model: no per-request overhead, so translate segments one by one.
+		return [
+			self.translate(text=text, source_lang=source_lang, target_lang=target_lang)
+			for text in segments
+		]
+
+
+class CheckpointTranslator(Translator):
+	"""Wraps a translator so every response is checkpointed in the job store.
+
+	Requests answered before (e.g. by a run that crashed halfway through the file)
+	are served from the checkpoints instead of the provider.
+	"""
+
+	def __init__(self, inner: Translator, store: JobStore, file_key: str, worker_id: str) -> None:
+		from job_store import chunk_key
+
+		self._chunk_key = chunk_key
+		self.inner = inner
+		self.store = store
+		self.file_key = file_key
+		self.worker_id = worker_id
+		self._done = store.load_chunks(file_key)
+		self._lock = threading.Lock()
+		self.reused = 0
+		self.translated = 0
+
+	def _lookup(self, key: str) -> str | None:
+		with self._lock:
+			output = self._done.get(key)
+			if output is not None:
+				self.reused += 1
+			return output
+
+	def _save(self, key: str, output: str) -> None:
+		self.store.save_chunk(self.file_key, key, output, self.worker_id)
+		with self._lock:
+			self._done[key] = output
+			self.translated += 1
+
+	def translate(self, *, text: str, source_lang: str, target_lang: str) -> str:
+		key = self._chunk_key("text", source_lang, target_lang, text)
+		output = self._lookup(key)
+		if output is None:
+			output = self.inner.translate(text=text, source_lang=source_lang, target_lang=target_lang)
+			self._save(key, output)
+		return output
+
+	def translate_segments(
+		self, segments: list[str], *, source_lang: str, target_lang: str
+	) -> list[str | None]:
+		key = self._chunk_key("segments", source_lang, target_lang, segments)
+		output = self._lookup(key)
+		if output is not None:
+			return json.loads(output)
+		result = self.inner.translate_segments(
+			segments, source_lang=source_lang, target_lang=target_lang
+		)
+		# A reply with nothing usable is not checkpointed, so the retry asks the provider again.
+		if any(value is not None for value in result):
+			self._save(key, json.dumps(result, ensure_ascii=False))
+		return result
+
+
+class LanguageFilter:
+	"""Local language check that lets text already in the target language pass through.
+
+	Counts what was passed through versus sent for translation for the run report.
+	"""
+
+	def __init__(self, target_lang: str) -> None:
+		import langid
+
+		if target_lang not in langid.SUPPORTED_LANGUAGES:
+			raise ValueError(
+				f"No language profile for '{target_lang}' "
+				f"(available: {', '.join(sorted(langid.SUPPORTED_LANGUAGES))})."
+			)
+		self._langid = langid
+		self.target_lang = target_lang
+		self._lock = threading.Lock()
+		self.files_skipped = 0
+		self.segments_passed = 0
+		self.chars_passed = 0
+		self.segments_translated = 0
+		self.chars_translated = 0
+
+	def is_done(self, text: str) -> bool:
+		"""True if `text` needs no translation: no letters, or already the target language."""
+		if not self._langid.letter_count(text):
+			return True
+		return self._langid.is_language(text, self.target_lang)
+
+	def check(self, text: str) -> bool:
+		"""Like `not is_done(text)`, but counted in the run report."""
+		needs = not self.is_done(text)
+		with self._lock:
+			if needs:
+				self.segments_translated += 1
+				self.chars_translated += len(text)
+			else:
+				self.segments_passed += 1
+				self.chars_passed += len(text)
+		return needs
+
+	def skip_file(self, texts: Iterable[str]) -> bool:
+		"""True (and counted) if none of `texts` needs translating.
+
+		`texts` is consumed lazily and only up to the first text that needs
+		translating, so streamed documents can be checked in a cheap first pass.
+		"""
+		chars = 0
+		for text in texts:
+			if not text.strip():
+				continue
+			if not self.is_done(text):
+				return False
+			chars += len(text)
+		with self._lock:
+			self.files_skipped += 1
+			self.chars_passed += chars
+		return True
+
+	def report(self) -> dict:
+		total = self.chars_passed + self.chars_translated
+		return {
+			"target_lang": self.target_lang,
+			"files_skipped": self.files_skipped,
+			"segments_passed_through": self.segments_passed,
+			"segments_translated": self.segments_translated,
+			"chars_passed_through": self.chars_passed,
+			"chars_translated": self.chars_translated,
+			"passed_through_pct": round(100.0 * self.chars_passed / total, 1) if total else 0.0,
+		}
+
 
 def get_translator(provider: str, model: str) -> Translator:
 	if provider == "openai":
@@ -152,110 +439,202 @@ def get_translator(provider: str, model: str) -> Translator:
 	raise ValueError(f"Unknown provider: {provider}")
 
 
-def extract_text_from_pdf(path: Path) -> str:
+def iter_pdf_pages(path: Path) -> Iterator[str]:
 	try:
 		import pdfplumber
 	except Exception as exc:  # pragma: no cover
 		raise RuntimeError("pdfplumber not installed. Install translate/requirements.txt.") from exc
 
-	parts: list[str] = []
+	if PAGE_TEXT_CACHE is not None:
+		yield from PAGE_TEXT_CACHE.iter_pages(
+			path,
+			backend="pdfplumber",
+			version=pdfplumber.__version__,
+			extract=_extract_pdf_pages,
+		)
+		return
+	yield from _extract_pdf_pages(path)
+
+
+def _extract_pdf_pages(path: Path) -> Iterator[str]:
+	import pdfplumber
+
 	with pdfplumber.open(str(path)) as pdf:
 		for page in pdf.pages:
 			page_text = page.extract_text() or ""
-			page_text = page_text.strip()
-			if page_text:
-				parts.append(page_text)
-	return "\n\n".join(parts).strip()
+			# Drop pdfplumber's per-page object cache so memory stays flat on long PDFs.
+			page.close()
+			yield page_text.strip()
 
 
-def write_pdf_from_text(path: Path, text: str) -> None:
-	# Simple “text PDF” output (not layout-preserving). Good for readable delivery.
-	try:
-		pagesizes = importlib.import_module("reportlab.lib.pagesizes")
-		units = importlib.import_module("reportlab.lib.units")
-		pdfmetrics = importlib.import_module("reportlab.pdfbase.pdfmetrics")
-		ttfonts = importlib.import_module("reportlab.pdfbase.ttfonts")
-		canvas_mod = importlib.import_module("reportlab.pdfgen.canvas")
-	except Exception as exc:  # pragma: no cover
-		raise RuntimeError("reportlab not installed. Install translate/requirements.txt.") from exc
-
-	LETTER = pagesizes.LETTER
-	inch = units.inch
-	TTFont = ttfonts.TTFont
-	Canvas = canvas_mod.Canvas
-
-	# Try to use a Unicode-capable font if available (falls back to built-in if not).
-	# On macOS, Arial Unicode may exist; if not, Helvetica will work for most ASCII.
-	font_name = "Helvetica"
-	for candidate_name, candidate_path in [
-		("DejaVuSans", "/Library/Fonts/DejaVuSans.ttf"),
-		("ArialUnicodeMS", "/Library/Fonts/Arial Unicode.ttf"),
-	]:
+def _chunk_chars(text: str) -> int:
+	# Character "tokens" for the chunker, counting the separator that joins each unit.
+	return len(text) + 2
+
+
+def iter_pdf_chunks(path: Path, max_chars: int) -> Iterator[str]:
+	# Sentence-aware chunks of at most max_chars characters, spanning pages; pages are
+	# read lazily, so this streams.
+	for chunk in chunk_pages(iter_pdf_pages(path), max_tokens=max_chars, count_tokens=_chunk_chars):
+		yield chunk.text
+
+
+class TextOutputWriter:
+	"""Writes translated chunks to a .txt file as they arrive."""
+
+	def __init__(self, path: Path) -> None:
+		self._fh = path.open("w", encoding="utf-8")
+		self._started = False
+
+	def write(self, text: str) -> None:
+		text = text.strip()
+		if not text:
+			return
+		if self._started:
+			self._fh.write("\n\n")
+		self._fh.write(text)
+		self._started = True
+
+	def close(self) -> None:
+		if self._started:
+			self._fh.write("\n")
+		self._fh.close()
+
+
+class DocxOutputWriter:
+	"""Writes translated chunks as paragraphs of a new .docx as they arrive."""
+
+	def __init__(self, path: Path) -> None:
+		from docx_stream import DocxStreamWriter
+
+		self._writer = DocxStreamWriter(path)
+		self._started = False
+
+	def write(self, text: str) -> None:
+		text = text.strip()
+		if not text:
+			return
+		if self._started:
+			self._writer.add_paragraph("")
+		for line in text.splitlines():
+			self._writer.add_paragraph(line)
+		self._started = True
+
+	def close(self) -> None:
+		self._writer.close()
+
+
+class PdfTextWriter:
+	"""Simple “text PDF” output (not layout-preserving). Good for readable delivery.
+
+	Pages are drawn as chunks arrive, but ReportLab keeps every finished page in
+	memory until `save()`, so memory grows with the length of the output. Use the
+	txt or docx writers when output size must stay bounded.
+	"""
+
+	def __init__(self, path: Path) -> None:
 		try:
-			if Path(candidate_path).exists():
-				pdfmetrics.registerFont(TTFont(candidate_name, candidate_path))
-				font_name = candidate_name
-				break
-		except Exception:
-			# If font registration fails, keep going with default.
-			pass
-
-	page_width, page_height = LETTER
-	margin = 0.75 * inch
-	max_width = page_width - (2 * margin)
-	line_height = 12
-	font_size = 10
-
-	c = Canvas(str(path), pagesize=LETTER)
-	c.setTitle(path.stem)
-	c.setFont(font_name, font_size)
-
-	y = page_height - margin
-
-	def new_page() -> None:
-		nonlocal y
-		c.showPage()
-		c.setFont(font_name, font_size)
-		y = page_height - margin
-
-	def draw_wrapped_line(line: str) -> None:
-		nonlocal y
+			pagesizes = importlib.import_module("reportlab.lib.pagesizes")
+			units = importlib.import_module("reportlab.lib.units")
+			pdfmetrics = importlib.import_module("reportlab.pdfbase.pdfmetrics")
+			ttfonts = importlib.import_module("reportlab.pdfbase.ttfonts")
+			canvas_mod = importlib.import_module("reportlab.pdfgen.canvas")
+		except Exception as exc:  # pragma: no cover
+			raise RuntimeError("reportlab not installed. Install translate/requirements.txt.") from exc
+
+		LETTER = pagesizes.LETTER
+		inch = units.inch
+		TTFont = ttfonts.TTFont
+		Canvas = canvas_mod.Canvas
+
+		# Try to use a Unicode-capable font if available (falls back to built-in if not).
+		# On macOS, Arial Unicode may exist; if not, Helvetica will work for most ASCII.
+		self.font_name = "Helvetica"
+		for candidate_name, candidate_path in [
+			("DejaVuSans", "/Library/Fonts/DejaVuSans.ttf"),
+			("ArialUnicodeMS", "/Library/Fonts/Arial Unicode.ttf"),
+		]:
+			try:
+				if Path(candidate_path).exists():
+					pdfmetrics.registerFont(TTFont(candidate_name, candidate_path))
+					self.font_name = candidate_name
+					break
+			except Exception:
+				# If font registration fails, keep going with default.
+				pass
+
+		page_width, self.page_height = LETTER
+		self.margin = 0.75 * inch
+		self.max_width = page_width - (2 * self.margin)
+		self.line_height = 12
+		self.font_size = 10
+
+		self._canvas = Canvas(str(path), pagesize=LETTER)
+		self._canvas.setTitle(path.stem)
+		self._canvas.setFont(self.font_name, self.font_size)
+		self._y = self.page_height - self.margin
+		self._started = False
+
+	def _advance(self) -> None:
+		self._y -= self.line_height
+		if self._y < self.margin:
+			self._canvas.showPage()
+			self._canvas.setFont(self.font_name, self.font_size)
+			self._y = self.page_height - self.margin
+
+	def _draw_wrapped_line(self, line: str) -> None:
 		# Wrap by words, measuring actual rendered width.
 		words = line.split()
 		if not words:
-			y -= line_height
-			if y < margin:
-				new_page()
+			self._advance()
 			return
 
+		c = self._canvas
 		current = words[0]
 		for w in words[1:]:
 			test = f"{current} {w}"
-			if c.stringWidth(test, font_name, font_size) <= max_width:
+			if c.stringWidth(test, self.font_name, self.font_size) <= self.max_width:
 				current = test
 			else:
-				c.drawString(margin, y, current)
-				y -= line_height
-				if y < margin:
-					new_page()
+				c.drawString(self.margin, self._y, current)
+				self._advance()
 				current = w
 
-		c.drawString(margin, y, current)
-		y -= line_height
-		if y < margin:
-			new_page()
-
-	for para in text.splitlines():
-		para = para.rstrip()
-		if not para:
-			# Blank line between paragraphs.
-			y -= line_height
-			if y < margin:
-				new_page()
-			continue
-		draw_wrapped_line(para)
+		c.drawString(self.margin, self._y, current)
+		self._advance()
+
+	def write(self, text: str) -> None:
+		text = text.strip()
+		if not text:
+			return
+		if self._started:
+			# Blank line between chunks.
+			self._advance()
+		for para in text.splitlines():
+			para = para.rstrip()
+			if not para:
+				# Blank line between paragraphs.
+				self._advance()
+				continue
+			self._draw_wrapped_line(para)
+		self._started = True
+
+	def close(self) -> None:
+		self._canvas.save()
+
+
+def open_output_writer(path: Path, pdf_output: str) -> TextOutputWriter | DocxOutputWriter | PdfTextWriter:
+	if pdf_output == "txt":
+		return TextOutputWriter(path)
+	if pdf_output == "docx":
+		return DocxOutputWriter(path)
+	return PdfTextWriter(path)
 
-	c.save()
+
+def write_pdf_from_text(path: Path, text: str) -> None:
+	writer = PdfTextWriter(path)
+	writer.write(text)
+	writer.close()
 
 
 def extract_text_from_docx(path: Path) -> list[str]:
@@ -335,6 +714,85 @@ def out_path_for_input(
 	raise ValueError(f"Unsupported extension: {input_path.suffix}")
 
 
+def translate_segment_batch(
+	translator: Translator,
+	segments: list[str],
+	*,
+	source_lang: str,
+	target_lang: str,
+) -> list[str]:
+	if len(segments) == 1:
+		# A lone segment cannot be misaligned; skip the id protocol entirely.
+		return [translator.translate(text=segments[0], source_lang=source_lang, target_lang=target_lang)]
+	result = translator.translate_segments(segments, source_lang=source_lang, target_lang=target_lang)
+	texts, _ = complete_segment_batch(
+		translator, segments, result, source_lang=source_lang, target_lang=target_lang
+	)
+	return texts
+
+
+def complete_segment_batch(
+	translator: Translator,
+	segments: list[str],
+	result: list[str | None],
+	*,
+	source_lang: str,
+	target_lang: str,
+) -> tuple[list[str], int]:
+	"""Request the segments `result` is missing; returns (texts, requests made).
+
+	`result` is a response to the whole batch, from a synchronous call or the Batch API.
+	"""
+	result = list(result)
+	missing = [i for i, value in enumerate(result) if value is None]
+	requests = 0
+	if missing:
+		requests = _recover_segments(
+			translator, segments, missing, result, source_lang=source_lang, target_lang=target_lang
+		)
+	return [value or "" for value in result], requests
+
+
+def _recover_segments(
+	translator: Translator,
+	segments: list[str],
+	missing: list[int],
+	result: list[str | None],
+	*,
+	source_lang: str,
+	target_lang: str,
+) -> int:
+	# Re-request the missing segments as one batch. If the reply again carries
+	# nothing usable (unparseable or truncated JSON), halve the batch and recurse,
+	# so a bad reply costs O(log n) extra requests before single-segment calls.
+	# Returns the number of requests made.
+	if len(missing) == 1:
+		i = missing[0]
+		result[i] = translator.translate(
+			text=segments[i], source_lang=source_lang, target_lang=target_lang
+		)
+		return 1
+	retried = translator.translate_segments(
+		[segments[i] for i in missing], source_lang=source_lang, target_lang=target_lang
+	)
+	for i, value in zip(missing, retried):
+		result[i] = value
+	still = [i for i in missing if result[i] is None]
+	if not still:
+		return 1
+	if len(still) < len(missing):
+		return 1 + _recover_segments(
+			translator, segments, still, result, source_lang=source_lang, target_lang=target_lang
+		)
+	mid = len(still) // 2
+	return 1 + sum(
+		_recover_segments(
+			translator, segments, half, result, source_lang=source_lang, target_lang=target_lang
+		)
+		for half in (still[:mid], still[mid:])
+	)
+
+
 def translate_paragraphs(
 	translator: Translator,
 	paragraphs: list[str],
@@ -343,55 +801,441 @@ def translate_paragraphs(
 	target_lang: str,
 	max_chunk_chars: int,
 	chunk_workers: int,
+	lang_filter: LanguageFilter | None = None,
 ) -> list[str]:
-	# Preserve empty lines by translating only non-empty paragraphs.
-	out: list[str] = []
-	buffer: list[str] = []
+	# Every non-empty paragraph is a segment with its own id, so many short paragraphs
+	# share one request and results map back 1:1. Empty paragraphs are kept as-is, as
+	# are paragraphs the language filter finds already in the target language.
+	out = [p.strip() for p in paragraphs]
+	indices = [
+		idx for idx, p in enumerate(out) if p and (lang_filter is None or lang_filter.check(p))
+	]
+	segments = [out[idx] for idx in indices]
+	batches = pack_segments(segments, max_chunk_chars)
+
+	def run(batch: list[int]) -> list[str]:
+		return translate_segment_batch(
+			translator,
+			[segments[i] for i in batch],
+			source_lang=source_lang,
+			target_lang=target_lang,
+		)
 
-	def flush_buffer() -> None:
-		if not buffer:
-			return
-		joined = "\n".join(buffer)
-		chunks = chunk_text(joined, max_chunk_chars)
-		workers = max(1, chunk_workers)
+	workers = min(max(1, chunk_workers), len(batches))
+	if workers <= 1:
+		translated_batches = [run(batch) for batch in batches]
+	else:
 		with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-			translated_chunks = list(
-				executor.map(
-					lambda c: translator.translate(
-						text=c, source_lang=source_lang, target_lang=target_lang
-					),
-					chunks,
+			translated_batches = list(executor.map(run, batches))
+
+	for batch, translated in zip(batches, translated_batches):
+		for i, text in zip(batch, translated):
+			out[indices[i]] = text
+	return out
+
+
+def translate_chunk(
+	translator: Translator,
+	chunk: str,
+	*,
+	source_lang: str,
+	target_lang: str,
+	lang_filter: LanguageFilter | None = None,
+) -> str:
+	if lang_filter is not None and not lang_filter.check(chunk):
+		return chunk
+	return translator.translate(text=chunk, source_lang=source_lang, target_lang=target_lang)
+
+
+def translate_pdf_streaming(
+	translator: Translator,
+	pdf_path: Path,
+	out_path: Path,
+	*,
+	pdf_output: str,
+	source_lang: str,
+	target_lang: str,
+	max_chunk_chars: int,
+	chunk_workers: int,
+	lang_filter: LanguageFilter | None = None,
+) -> int:
+	"""Extract, translate and write a PDF chunk by chunk; returns the number of chunks.
+
+	Pages are read lazily, chunks are translated with at most 2 * chunk_workers in
+	flight, and translated chunks are written in order as soon as they are ready.
+	Output goes to a .part file that is renamed only once the document is complete.
+	"""
+	part_path = out_path.with_name(out_path.name + ".part")
+	chunks = iter_pdf_chunks(pdf_path, max_chunk_chars)
+	translated = ordered_map(
+		lambda c: translate_chunk(
+			translator,
+			c,
+			source_lang=source_lang,
+			target_lang=target_lang,
+			lang_filter=lang_filter,
+		),
+		chunks,
+		workers=chunk_workers,
+		max_pending=2 * max(1, chunk_workers),
+	)
+
+	count = 0
+	writer = open_output_writer(part_path, pdf_output)
+	try:
+		for text in translated:
+			writer.write(text)
+			count += 1
+		writer.close()
+	except BaseException:
+		part_path.unlink(missing_ok=True)
+		raise
+
+	if count == 0:
+		part_path.unlink(missing_ok=True)
+	else:
+		part_path.replace(out_path)
+	return count
+
+
+def iter_paragraph_groups(paragraphs: Iterable[str], max_chars: int) -> Iterator[list[str]]:
+	# Consecutive paragraphs whose text fits one request (same sizing as pack_segments).
+	group: list[str] = []
+	size = 0
+	for p in paragraphs:
+		add_len = len(p.strip()) + 8 if p.strip() else 0
+		if group and add_len and size + add_len > max_chars:
+			yield group
+			group = []
+			size = 0
+		group.append(p)
+		size += add_len
+	if group:
+		yield group
+
+
+def translate_docx_streaming(
+	translator: Translator,
+	docx_path: Path,
+	out_path: Path,
+	*,
+	source_lang: str,
+	target_lang: str,
+	max_chunk_chars: int,
+	chunk_workers: int,
+	lang_filter: LanguageFilter | None = None,
+) -> int:
+	"""Translate a .docx paragraph group by group, rewriting it into a copy of the package.
+
+	Paragraphs are read incrementally from word/document.xml and written back in
+	order as their group is translated, keeping styles, tables, images and all
+	other parts of the original. Returns the number of paragraphs rewritten.
+	"""
+	from docx_stream import iter_paragraph_texts, rewrite_docx
+
+	groups = iter_paragraph_groups(iter_paragraph_texts(docx_path), max_chunk_chars)
+	translated_groups = ordered_map(
+		lambda group: translate_paragraphs(
+			translator,
+			group,
+			source_lang=source_lang,
+			target_lang=target_lang,
+			max_chunk_chars=max_chunk_chars,
+			chunk_workers=1,
+			lang_filter=lang_filter,
+		),
+		groups,
+		workers=chunk_workers,
+		max_pending=2 * max(1, chunk_workers),
+	)
+	translated = (p for group in translated_groups for p in group)
+
+	part_path = out_path.with_name(out_path.name + ".part")
+	try:
+		rewritten = rewrite_docx(docx_path, part_path, translated)
+	except BaseException:
+		part_path.unlink(missing_ok=True)
+		raise
+	part_path.replace(out_path)
+	return rewritten
+
+
+def batch_file_key(path: Path, generation: int = 0) -> str:
+	# A file re-planned with --overwrite gets a new key, so stale results of the
+	# earlier plan cannot be mistaken for the new one's.
+	name = f"{path}#{generation}" if generation else str(path)
+	return hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+
+
+def plan_batch_file(
+	translator: OpenAITranslator,
+	path: Path,
+	*,
+	source_lang: str,
+	target_lang: str,
+	max_chunk_chars: int,
+	lang_filter: LanguageFilter | None = None,
+) -> tuple[dict, list[dict]] | None:
+	"""Extract a file and build its Batch API request bodies.
+
+	Returns None if there is no text, or nothing left to translate.
+	"""
+	ext = path.suffix.lower()
+	if ext == ".pdf":
+		chunks = list(iter_pdf_chunks(path, max_chunk_chars))
+		if not chunks or (lang_filter is not None and lang_filter.skip_file(chunks)):
+			return None
+		needs = [lang_filter is None or lang_filter.check(c) for c in chunks]
+		bodies = [
+			translator.translation_request(text=c, source_lang=source_lang, target_lang=target_lang)
+			for c, need in zip(chunks, needs)
+			if need
+		]
+		return {"kind": "pdf", "chunks": chunks, "translate": needs}, bodies
+
+	if ext == ".doc":
+		with tempfile.TemporaryDirectory(prefix="translate-doc-") as td:
+			paragraphs = extract_text_from_docx(convert_doc_to_docx(path, temp_dir=Path(td)))
+	else:
+		paragraphs = extract_text_from_docx(path)
+	if lang_filter is not None and lang_filter.skip_file(paragraphs):
+		return None
+	indices = [
+		idx
+		for idx, p in enumerate(paragraphs)
+		if p.strip() and (lang_filter is None or lang_filter.check(p.strip()))
+	]
+	segments = [paragraphs[idx].strip() for idx in indices]
+	batches = pack_segments(segments, max_chunk_chars)
+	bodies = []
+	for batch in batches:
+		texts = [segments[i] for i in batch]
+		if len(texts) == 1:
+			bodies.append(
+				translator.translation_request(
+					text=texts[0], source_lang=source_lang, target_lang=target_lang
 				)
 			)
-		translated = "\n".join(translated_chunks).splitlines()
+		else:
+			bodies.append(
+				translator.segments_request(texts, source_lang=source_lang, target_lang=target_lang)
+			)
+	plan = {"kind": "docx", "paragraphs": paragraphs, "indices": indices, "batches": batches}
+	return plan, bodies
 
-		# Best-effort: map translated lines back to paragraph count; if mismatch,
-		# collapse to a single paragraph to avoid misalignment.
-		if len(translated) != len(buffer):
-			out.extend(["\n".join(translated).strip()])
+
+def assemble_batch_file(
+	translator: OpenAITranslator,
+	plan: dict,
+	results: dict[int, str | None],
+	out_path: Path,
+	*,
+	pdf_output: str,
+	source_lang: str,
+	target_lang: str,
+	chunk_workers: int = 1,
+) -> int:
+	"""Write one file from its batch results; returns how many requests had to be redone.
+
+	Requests still without a result (after batch resubmission) are redone
+	synchronously, `chunk_workers` at a time.
+	"""
+	if plan["kind"] == "pdf":
+		needs = plan.get("translate") or [True] * len(plan["chunks"])
+		out: list[str] = []
+		missing: list[int] = []
+		index = 0
+		for chunk, need in zip(plan["chunks"], needs):
+			content = None
+			if need:
+				content = results.get(index)
+				index += 1
+				if content is None:
+					missing.append(len(out))
+			out.append(chunk if content is None else content)
+
+		def redo(position: int) -> str:
+			return translator.translate(
+				text=out[position], source_lang=source_lang, target_lang=target_lang
+			)
+
+		workers = min(max(1, chunk_workers), len(missing))
+		if workers > 1:
+			with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+				redone_texts = list(executor.map(redo, missing))
 		else:
-			out.extend(translated)
+			redone_texts = [redo(position) for position in missing]
+		for position, text in zip(missing, redone_texts):
+			out[position] = text
 
-		buffer.clear()
+		part_path = out_path.with_name(out_path.name + ".part")
+		writer = open_output_writer(part_path, pdf_output)
+		try:
+			for text in out:
+				writer.write(text)
+			writer.close()
+		except BaseException:
+			part_path.unlink(missing_ok=True)
+			raise
+		part_path.replace(out_path)
+		return len(missing)
+
+	paragraphs: list[str] = plan["paragraphs"]
+	indices: list[int] = plan["indices"]
+	out = [p.strip() for p in paragraphs]
+
+	def run(index: int) -> tuple[list[str], int]:
+		batch = plan["batches"][index]
+		texts = [paragraphs[indices[i]].strip() for i in batch]
+		content = results.get(index)
+		if content is None:
+			initial: list[str | None] = [None] * len(texts)
+		elif len(texts) == 1:
+			initial = [content]
+		else:
+			initial = parse_json_segments(content, len(texts))
+		return complete_segment_batch(
+			translator, texts, initial, source_lang=source_lang, target_lang=target_lang
+		)
 
-	for idx, p in enumerate(paragraphs):
-		text = p.strip()
-		if not text:
-			flush_buffer()
-			out.append("")
-			continue
+	batch_indices = range(len(plan["batches"]))
+	workers = min(max(1, chunk_workers), len(batch_indices))
+	if workers > 1:
+		with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+			translated_batches = list(executor.map(run, batch_indices))
+	else:
+		translated_batches = [run(index) for index in batch_indices]
+	redone = 0
+	for batch, (translated, requests) in zip(plan["batches"], translated_batches):
+		redone += requests
+		for i, text in zip(batch, translated):
+			out[indices[i]] = text
+	write_docx(out_path, out)
+	return redone
+
+
+def run_batch_mode(
+	args: argparse.Namespace,
+	files: list[Path],
+	output_dir: Path | None,
+	lang_filter: LanguageFilter | None = None,
+) -> int:
+	"""Plan, submit, poll and assemble a --mode batch run; safe to re-run after a restart."""
+	from openai_batch import BatchStore
+
+	if args.provider != "openai":
+		eprint("--mode batch requires --provider openai.")
+		return 2
 
-		buffer.append(text)
+	translator = OpenAITranslator(model=args.openai_model)
+	batch_dir = (
+		Path(args.batch_dir).expanduser().resolve()
+		if args.batch_dir
+		else (output_dir or Path(args.input_dir).expanduser().resolve()) / ".translate-batch"
+	)
+	store = BatchStore(batch_dir)
+	print(f"Batch state: {batch_dir}")
+
+	planned = 0
+	known = {record["input"]: key for key, record in store.files.items()}
+	for path in files:
+		previous = known.get(str(path))
+		generation = 0
+		if previous is not None:
+			# Files still in flight are never re-planned; finished ones are with --overwrite.
+			if not args.overwrite or store.files[previous]["status"] != "done":
+				continue
+			generation = store.files[previous].get("generation", 0) + 1
+		key = batch_file_key(path, generation)
+		out_path = out_path_for_input(path, output_dir=output_dir, pdf_output=args.pdf_output)
+		if out_path.exists() and not args.overwrite:
+			print(f"{path}: Skip (exists): {out_path}")
+			continue
+		try:
+			planned_file = plan_batch_file(
+				translator,
+				path,
+				source_lang=args.source_lang,
+				target_lang=args.target_lang,
+				max_chunk_chars=args.max_chunk_chars,
+				lang_filter=lang_filter,
+			)
+		except Exception as exc:
+			eprint(f"Error planning {path}: {exc}")
+			continue
+		if planned_file is None:
+			print(f"Skip (no extractable text or already {args.target_lang}): {path}")
+			continue
+		plan, bodies = planned_file
+		if previous is not None:
+			store.drop_file(previous)
+		store.add_file(
+			key,
+			{
+				"input": str(path),
+				"output": str(out_path),
+				"pdf_output": args.pdf_output,
+				"generation": generation,
+			},
+			plan,
+			bodies,
+		)
+		planned += 1
 
-		# Flush before buffer gets too big.
-		if sum(len(x) + 1 for x in buffer) > max_chunk_chars:
-			flush_buffer()
+	client = translator._client()
+	created = store.submit(client)
+	print(f"Planned {planned} new files; submitted {len(created)} new batches.")
 
-	flush_buffer()
-	return out
+	while True:
+		if args.batch_no_wait:
+			store.refresh(client)
+		else:
+			store.wait(client, poll_seconds=args.batch_poll_seconds)
+		store.collect(client)
+		# Requests of failed/expired batches go out again as a new batch rather than
+		# as synchronous calls; only what exhausts the attempts is redone below.
+		queued = store.resubmit_failed(max_attempts=args.batch_max_attempts)
+		if not queued:
+			break
+		created = store.submit(client)
+		print(f"Resubmitted {queued} requests without a result in {len(created)} new batches.")
+		if args.batch_no_wait:
+			break
+
+	settled = store.all_terminal()
+	for key, record in store.files.items():
+		if record["status"] != "pending":
+			continue
+		results = store.load_results(key)
+		complete = all(results.get(i) is not None for i in range(record["requests"]))
+		if not complete and not settled:
+			continue
+		try:
+			redone = assemble_batch_file(
+				translator,
+				store.load_plan(key),
+				results,
+				Path(record["output"]),
+				pdf_output=record["pdf_output"],
+				source_lang=args.source_lang,
+				target_lang=args.target_lang,
+				chunk_workers=args.chunk_workers,
+			)
+		except Exception as exc:
+			eprint(f"Error writing {record['input']}: {exc}")
+			continue
+		store.mark(key, "done", redone=redone)
+		print(f"{record['input']}: Wrote: {record['output']} (re-requested {redone})")
+
+	remaining = sum(1 for record in store.files.values() if record["status"] == "pending")
+	if remaining:
+		print(f"{remaining} files still waiting on batches; re-run to collect them.")
+	if lang_filter is not None:
+		print(f"Language filter: {json.dumps(lang_filter.report())}")
+	return 0
 
 
-def main() -> int:
+def build_parser() -> argparse.ArgumentParser:
 	parser = argparse.ArgumentParser(
 		description="Translate .pdf/.doc/.docx files (default: Slovenian -> English) and write -eng outputs."
 	)
@@ -418,11 +1262,22 @@ def main() -> int:
 	)
 	parser.add_argument("--source-lang", default="sl", help="Source language code (default: sl).")
 	parser.add_argument("--target-lang", default="en", help="Target language code (default: en).")
+	parser.add_argument(
+		"--skip-target-lang",
+		action="store_true",
+		help=(
+			"Detect language locally and pass through paragraphs/chunks already in --target-lang; "
+			"files with nothing left to translate are skipped."
+		),
+	)
 	parser.add_argument(
 		"--max-chunk-chars",
 		type=int,
 		default=3500,
-		help="Max characters per translation chunk (lower avoids API limits).",
+		help=(
+			"Max characters per translation request (lower avoids API limits). "
+			"DOCX paragraphs are packed into requests up to this size with segment ids."
+		),
 	)
 	parser.add_argument(
 		"--workers",
@@ -442,13 +1297,113 @@ def main() -> int:
 		default="pdf",
 		help="For .pdf inputs, output format (default: pdf).",
 	)
+	parser.add_argument(
+		"--mode",
+		choices=["sync", "batch"],
+		default="sync",
+		help=(
+			"sync (default) calls the provider per chunk; batch queues every chunk through "
+			"the OpenAI Batch API (cheaper, no synchronous rate limits, results within 24h)."
+		),
+	)
+	parser.add_argument(
+		"--batch-dir",
+		default="",
+		help="State directory for --mode batch (default: <output-dir or input-dir>/.translate-batch).",
+	)
+	parser.add_argument(
+		"--batch-poll-seconds",
+		type=float,
+		default=60.0,
+		help="Seconds between batch status checks (default: 60).",
+	)
+	parser.add_argument(
+		"--batch-max-attempts",
+		type=int,
+		default=3,
+		help=(
+			"Batches a request is sent in before it is redone synchronously; requests of a failed "
+			"or expired batch are resubmitted as a new batch until then (default: 3)."
+		),
+	)
+	parser.add_argument(
+		"--batch-no-wait",
+		action="store_true",
+		help="Submit and collect whatever is finished, then exit instead of polling.",
+	)
+	parser.add_argument(
+		"--stream",
+		action="store_true",
+		help=(
+			"Stream documents: read PDF pages / DOCX paragraphs incrementally and write "
+			"translated output in order as it completes (constant memory on very large files). "
+			"DOCX output then keeps the original styles, tables and images."
+		),
+	)
+	parser.add_argument(
+		"--text-cache-dir",
+		default="",
+		help=f"Extracted PDF page-text cache (default: $PAGE_TEXT_CACHE_DIR or {default_cache_dir()}).",
+	)
+	parser.add_argument(
+		"--text-cache-max-mb",
+		type=int,
+		default=DEFAULT_MAX_BYTES // (1024 * 1024),
+		help="Evict least recently used cache entries beyond this size.",
+	)
+	parser.add_argument(
+		"--no-text-cache",
+		action="store_true",
+		help="Always re-extract PDF text instead of using the page-text cache.",
+	)
 	parser.add_argument(
 		"--overwrite",
 		action="store_true",
 		help="Overwrite existing -eng outputs.",
 	)
+	parser.add_argument(
+		"--job-db",
+		default="",
+		help=(
+			"SQLite job store: queue files and checkpoint every translated chunk so a killed run "
+			"resumes where it stopped. Point workers on several hosts at the same file to share the work."
+		),
+	)
+	parser.add_argument("--worker-id", default="", help="Worker name in --job-db (default: host-pid).")
+	parser.add_argument(
+		"--lease-seconds",
+		type=float,
+		default=600.0,
+		help="--job-db lease per file; files of a dead worker are picked up after it (default: 600).",
+	)
+	parser.add_argument(
+		"--max-attempts",
+		type=int,
+		default=3,
+		help="--job-db attempts per file before it is marked failed (default: 3).",
+	)
+	parser.add_argument(
+		"--retry-failed",
+		action="store_true",
+		help="Re-queue --job-db files that used up their attempts.",
+	)
+	parser.add_argument(
+		"--job-report",
+		action="store_true",
+		help="Print the --job-db report (files by status, per-worker totals) and exit.",
+	)
+	return parser
 
-	args = parser.parse_args()
+
+def run(
+	args: argparse.Namespace, translator_factory: Callable[[], Translator] | None = None
+) -> int:
+	"""Run a translation with parsed CLI arguments.
+
+	`translator_factory` replaces the --provider translator in sync mode (used by
+	benchmark.py to plug in a mock provider).
+	"""
+	make_translator = translator_factory or (lambda: get_translator(args.provider, args.openai_model))
 
 	input_dir = Path(args.input_dir).expanduser().resolve()
 	if not input_dir.exists() or not input_dir.is_dir():
@@ -459,32 +1414,98 @@ def main() -> int:
 	if output_dir is not None:
 		output_dir.mkdir(parents=True, exist_ok=True)
 
+	global PAGE_TEXT_CACHE
+	if not args.no_text_cache:
+		PAGE_TEXT_CACHE = PageTextCache(
+			Path(args.text_cache_dir).expanduser() if args.text_cache_dir else None,
+			max_bytes=args.text_cache_max_mb * 1024 * 1024,
+		)
+
+	job_store = None
+	if args.job_db:
+		if args.mode == "batch":
+			eprint("--job-db applies to --mode sync; batch mode resumes from --batch-dir.")
+			return 2
+		from job_store import JobStore
+
+		job_store = JobStore(
+			Path(args.job_db).expanduser().resolve(),
+			lease_seconds=args.lease_seconds,
+			max_attempts=args.max_attempts,
+		)
+		if args.job_report:
+			print(json.dumps(job_store.report(), indent=2))
+			return 0
+		if args.retry_failed:
+			job_store.retry_failed()
+
 	files = list(iter_files(input_dir))
+	if job_store is not None:
+		print(f"Job store: queued {job_store.enqueue_files(files, input_dir)} new of {len(files)} files")
 	if not files:
 		print("No supported files found.")
 		return 0
 
+	try:
+		lang_filter = LanguageFilter(args.target_lang) if args.skip_target_lang else None
+	except ValueError as exc:
+		eprint(f"--skip-target-lang: {exc}")
+		return 2
+
+	if args.mode == "batch":
+		return run_batch_mode(args, files, output_dir, lang_filter)
+
 	workers = max(1, args.workers)
 	chunk_workers = max(1, args.chunk_workers)
 	print(f"Found {len(files)} files to translate. workers={workers} chunk_workers={chunk_workers}")
 
-	def translate_one_file(path: Path) -> str:
-		translator = get_translator(args.provider, args.openai_model)
+	def translate_one_file(path: Path, translator: Translator | None = None) -> str:
+		translator = translator or make_translator()
 		out_path = out_path_for_input(path, output_dir=output_dir, pdf_output=args.pdf_output)
 		if out_path.exists() and not args.overwrite:
 			return f"Skip (exists): {out_path}"
 
 		ext = path.suffix.lower()
+		if ext == ".pdf" and args.stream:
+			if lang_filter is not None:
+				# First pass over the chunks (page text is cached, so the second pass
+				# does not parse the PDF again); stops at the first chunk to translate.
+				chunks = iter_pdf_chunks(path, args.max_chunk_chars)
+				first = next(chunks, None)
+				if first is None:
+					return f"Skip (no extractable text): {path}"
+				if lang_filter.skip_file(itertools.chain([first], chunks)):
+					return f"Skip (already {args.target_lang}): {path}"
+			written = translate_pdf_streaming(
+				translator,
+				path,
+				out_path,
+				pdf_output=args.pdf_output,
+				source_lang=args.source_lang,
+				target_lang=args.target_lang,
+				max_chunk_chars=args.max_chunk_chars,
+				chunk_workers=chunk_workers,
+				lang_filter=lang_filter,
+			)
+			if not written:
+				return f"Skip (no extractable text): {path}"
+			return f"Wrote: {out_path}"
+
 		if ext == ".pdf":
-			text = extract_text_from_pdf(path)
-			if not text.strip():
+			chunks = list(iter_pdf_chunks(path, args.max_chunk_chars))
+			if not chunks:
 				return f"Skip (no extractable text): {path}"
-			chunks = chunk_text(text, args.max_chunk_chars)
+			if lang_filter is not None and lang_filter.skip_file(chunks):
+				return f"Skip (already {args.target_lang}): {path}"
 			with concurrent.futures.ThreadPoolExecutor(max_workers=chunk_workers) as executor:
 				translated_chunks = list(
 					executor.map(
-						lambda c: translator.translate(
-							text=c, source_lang=args.source_lang, target_lang=args.target_lang
+						lambda c: translate_chunk(
+							translator,
+							c,
+							source_lang=args.source_lang,
+							target_lang=args.target_lang,
+							lang_filter=lang_filter,
 						),
 						chunks,
 					)
@@ -498,8 +1519,31 @@ def main() -> int:
 				write_pdf_from_text(out_path, translated_text)
 			return f"Wrote: {out_path}"
 
+		if ext in {".docx", ".doc"} and args.stream:
+			from docx_stream import iter_paragraph_texts
+
+			with tempfile.TemporaryDirectory(prefix="translate-doc-") as td:
+				docx_path = path
+				if ext == ".doc":
+					docx_path = convert_doc_to_docx(path, temp_dir=Path(td))
+				if lang_filter is not None and lang_filter.skip_file(iter_paragraph_texts(docx_path)):
+					return f"Skip (already {args.target_lang}): {path}"
+				translate_docx_streaming(
+					translator,
+					docx_path,
+					out_path,
+					source_lang=args.source_lang,
+					target_lang=args.target_lang,
+					max_chunk_chars=args.max_chunk_chars,
+					chunk_workers=chunk_workers,
+					lang_filter=lang_filter,
+				)
+			return f"Wrote: {out_path}"
+
 		if ext == ".docx":
 			paragraphs = extract_text_from_docx(path)
+			if lang_filter is not None and lang_filter.skip_file(paragraphs):
+				return f"Skip (already {args.target_lang}): {path}"
 			translated = translate_paragraphs(
 				translator,
 				paragraphs,
@@ -507,6 +1551,7 @@ def main() -> int:
 				target_lang=args.target_lang,
 				max_chunk_chars=args.max_chunk_chars,
 				chunk_workers=chunk_workers,
+				lang_filter=lang_filter,
 			)
 			write_docx(out_path, translated)
 			return f"Wrote: {out_path}"
@@ -516,21 +1561,45 @@ def main() -> int:
 				temp_dir = Path(td)
 				docx_path = convert_doc_to_docx(path, temp_dir=temp_dir)
 				paragraphs = extract_text_from_docx(docx_path)
+				if lang_filter is not None and lang_filter.skip_file(paragraphs):
+					return f"Skip (already {args.target_lang}): {path}"
 				translated = translate_paragraphs(
 					translator,
 					paragraphs,
 					source_lang=args.source_lang,
 					target_lang=args.target_lang,
 					max_chunk_chars=args.max_chunk_chars,
-						chunk_workers=chunk_workers,
+					chunk_workers=chunk_workers,
+					lang_filter=lang_filter,
 				)
 				write_docx(out_path, translated)
 			return f"Wrote: {out_path}"
 
 		return f"Skip (unsupported): {path}"
 
+	if job_store is not None:
+		run_job_workers(
+			job_store,
+			worker_id=args.worker_id or default_worker_id(),
+			input_dir=input_dir,
+			workers=workers,
+			translate_file=translate_one_file,
+			make_translator=make_translator,
+		)
+		print(f"Job store: {json.dumps(job_store.report())}")
+	else:
+		translate_files_parallel(files, workers=workers, translate_file=translate_one_file)
+
+	if lang_filter is not None:
+		print(f"Language filter: {json.dumps(lang_filter.report())}")
+	return 0
+
+
+def translate_files_parallel(
+	files: list[Path], *, workers: int, translate_file: Callable[[Path], str]
+) -> None:
 	with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-		future_to_path = {executor.submit(translate_one_file, p): p for p in files}
+		future_to_path = {executor.submit(translate_file, p): p for p in files}
 		for future in concurrent.futures.as_completed(future_to_path):
 			path = future_to_path[future]
 			try:
@@ -538,7 +1607,62 @@ def main() -> int:
 			except Exception as exc:
 				eprint(f"Error translating {path}: {exc}")
 
-	return 0
+
+def run_job_workers(
+	store: JobStore,
+	*,
+	worker_id: str,
+	input_dir: Path,
+	workers: int,
+	translate_file: Callable[[Path, Translator], str],
+	make_translator: Callable[[], Translator],
+) -> dict:
+	"""Claim files from the job store in `workers` threads until none are left.
+
+	Each file is translated through a CheckpointTranslator, so chunks finished by an
+	earlier (crashed) attempt are reused. Returns this process's summary.
+	"""
+	store.register_worker(worker_id)
+	summary = {"files_done": 0, "files_failed": 0, "files_lost": 0, "chunks_translated": 0, "chunks_reused": 0}
+	lock = threading.Lock()
+
+	def loop() -> None:
+		while True:
+			task = store.claim(worker_id)
+			if task is None:
+				return
+			path = input_dir / task.payload["path"]
+			translator = CheckpointTranslator(make_translator(), store, task.key, worker_id)
+			try:
+				with store.leased(task, worker_id) as lost:
+					message = translate_file(path, translator)
+				print(f"{path}: {message} (attempt {task.attempts}, {translator.reused} chunks resumed)")
+				if not lost.is_set() and store.complete(task.key, worker_id, {"message": message}):
+					outcome = "files_done"
+				else:
+					eprint(f"{path}: lease lost; another worker owns this file now")
+					outcome = "files_lost"
+			except Exception as exc:
+				store.fail(task.key, worker_id, f"{type(exc).__name__}: {exc}")
+				eprint(f"Error translating {path} (attempt {task.attempts}): {exc}")
+				outcome = "files_failed"
+			with lock:
+				summary[outcome] += 1
+				summary["chunks_translated"] += translator.translated
+				summary["chunks_reused"] += translator.reused
+				snapshot = dict(summary)
+			store.update_worker(worker_id, snapshot)
+
+	threads = [threading.Thread(target=loop, name=f"job-worker-{i}") for i in range(max(1, workers))]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	return summary
+
+
+def main() -> int:
+	return run(build_parser().parse_args())
 
 
 if __name__ == "__main__":